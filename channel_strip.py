@@ -6,41 +6,57 @@
 # Size of source mod 2**32: 7016 bytes
 from __future__ import absolute_import, print_function, unicode_literals
 from itertools import chain
+import time
 from _Framework.ChannelStripComponent import ChannelStripComponent as ChannelstripComponentBase
 from _Framework.SubjectSlot import subject_slot
-from _Framework import Task
 from _Framework.Dependency import depends
 from _Framework.Util import nop
 from _Framework.Control import EncoderControl
 
 
 
-import logging
-logger = logging.getLogger(__name__)
-MAX_ALLOWED_VOLUME = 0.85 # 0db
+from .logger import logger
+TOUCH_IDLE_TIMEOUT = 0.5 # Seconds without fader messages that end a gesture
+UNSELECTABLE_TRACK_NAMES = ("Master", "Main")
 
 class ChannelStripComponent(ChannelstripComponentBase):
     volume_control = EncoderControl()
 
     @depends(show_message=nop)
-    def __init__(self, show_message=nop, *a, **k):
+    def __init__(self, volume_limiter=None, show_message=nop, *a, **k):
+        self._volume_limiter = volume_limiter
+        self._volume_ceiling = None
         (super(ChannelStripComponent, self).__init__)(*a, **k)
         self._show_message = show_message
-        self._reset_volume_task = self._tasks.add(Task.run(self.reset_volume))
-        self._reset_volume_task.kill()
+        self.touch_idle_timeout = TOUCH_IDLE_TIMEOUT
+        self._last_touch_time = None
 
     def set_track(self, track):
         super(ChannelStripComponent, self).set_track(track)
-        if self._track != None:
-            self._on_volume_changed.subject = self._track.mixer_device.volume
+        self._last_touch_time = None
+        self.update_volume_ceiling()
+
+    def update_volume_ceiling(self):
+        # Volume is only observed while a ceiling applies to the track
+        ceiling = None
+        if self._track != None and self._volume_limiter != None:
+            ceiling = self._volume_limiter.ceiling_for(self._track)
+        self._volume_ceiling = ceiling
+        self._on_volume_changed.subject = self._track.mixer_device.volume if ceiling is not None else None
 
     def reset_volume(self):
-        # TODO: noop for now (it wasnt so useful)
-        return
-        # if self._track.mixer_device.volume.value > MAX_ALLOWED_VOLUME:
-        #     logger.info("Resetting volume to 0db")
-        #     self._show_message("Resetting volume to 0db")
-        #     self._track.mixer_device.volume.value = MAX_ALLOWED_VOLUME
+        """
+        Pulls the volume back to the ceiling. Returns True if it was written.
+        """
+        if self._track == None or self._volume_ceiling is None:
+            return False
+        volume = self._track.mixer_device.volume
+        if volume.value <= self._volume_ceiling:
+            return False
+        logger.info("Resetting volume of %s to %.2f", self._track.name, self._volume_ceiling)
+        self._show_message("XoneK2: %s volume limited to its ceiling (%.2f)" % (self._track.name, self._volume_ceiling))
+        volume.value = self._volume_ceiling
+        return True
 
     def set_volume_control(self, control):
         if self._volume_control != None:
@@ -52,15 +68,19 @@ class ChannelStripComponent(ChannelstripComponentBase):
             self._volume_control.add_value_listener(self._on_volume_control_touched)
 
     def _on_volume_control_touched(self, value):
-        if self._track.name == "Master" or self._track == "Main":
+        # A gesture starts with the first fader message after at least
+        # touch_idle_timeout seconds of silence; only that one selects.
+        now = time.time()
+        last_touch_time, self._last_touch_time = self._last_touch_time, now
+        if last_touch_time is not None and now - last_touch_time < self.touch_idle_timeout:
+            return
+        if self._track == None or self._track.name in UNSELECTABLE_TRACK_NAMES:
             return
         self.song().view.selected_track = self._track
-        logger.info("Volume control touched for track: %s" % self._track.name)
+        logger.info("Volume control touched for track: %s", self._track.name)
 
     @subject_slot("value")
     def _on_volume_changed(self):
-        # self.song().view.selected_track = self._track
-
-        # if volume is more than 0db, reset it to 0db
-        if self._track.mixer_device.volume.value > MAX_ALLOWED_VOLUME and self._reset_volume_task.is_killed:
-            self._reset_volume_task.restart()
+        # Only report the crossing; the limiter pulls it back on the next tick
+        if self._track.mixer_device.volume.value > self._volume_ceiling:
+            self._volume_limiter.report(self)
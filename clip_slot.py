@@ -0,0 +1,66 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from _Framework.ClipSlotComponent import ClipSlotComponent as ClipSlotComponentBase
+from ableton.v2.base import liveobj_valid
+
+
+class ClipSlotComponent(ClipSlotComponentBase):
+    """
+    Clip slot whose launch LED shows the slot state in the K2's colours:
+    green while playing, amber while triggered and red while recording.
+    The slot listeners from the base class push each change to this slot's
+    LED only, and re-setting the same clip slot is a no-op.
+    """
+
+    def __init__(self, *a, **k):
+        self._state_leds = None
+        self._lit_led = None
+        super(ClipSlotComponent, self).__init__(*a, **k)
+
+    def set_clip_slot(self, clip_slot):
+        # Scene updates hand every slot its clip slot again; only rewire the
+        # listeners when it actually changed.
+        if clip_slot == self._clip_slot:
+            return
+        super(ClipSlotComponent, self).set_clip_slot(clip_slot)
+
+    def set_state_leds(self, playing, triggered, recording):
+        """
+        Buttons addressing the launch button's LED in the playing, triggered
+        and recording colours.
+        """
+        if self._lit_led is not None:
+            self._lit_led.turn_off()
+        self._state_leds = {
+            'playing': playing,
+            'triggered': triggered,
+            'recording': recording,
+        }
+        self._lit_led = None
+        self.update()
+
+    def _slot_state(self):
+        slot = self._clip_slot
+        if not liveobj_valid(slot):
+            return None
+        if slot.is_recording:
+            return 'recording'
+        if slot.is_triggered:
+            return 'triggered'
+        if slot.is_playing:
+            return 'playing'
+        return None
+
+    def update(self):
+        if self._state_leds is None:
+            return super(ClipSlotComponent, self).update()
+        super(ClipSlotComponentBase, self).update()
+        if not self.is_enabled():
+            return
+        led = self._state_leds.get(self._slot_state())
+        # The previous colour is turned off before the new one is lit, so
+        # the LED ends up in the new colour within the same tick.
+        if self._lit_led is not None and self._lit_led is not led:
+            self._lit_led.turn_off()
+        self._lit_led = led
+        if led is not None:
+            led.turn_on()
@@ -0,0 +1,73 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from ableton.v3.live import liveobj_valid
+from .util import live_key
+
+FILTER_DEVICE_NAMES = ("Macro Filter+EQ",)
+FILTER_PARAMETER_NAMES = ("Lowpass",)
+
+
+class DeviceLookupCache(object):
+    """
+    Caches, per track, the device a strip should control and that device's
+    target parameter. Device names are matched from the end of the chain
+    (the last matching device wins); parameter names are tried in order.
+
+    Entries are dropped by the owners' devices/name/parameters listeners. A
+    hit is also rejected if the track's device count changed or the cached
+    device was deleted, which covers tracks that were off-bank and therefore
+    had no listeners attached when they changed.
+    """
+
+    def __init__(self, device_names=FILTER_DEVICE_NAMES, parameter_names=FILTER_PARAMETER_NAMES):
+        self._device_names = frozenset(device_names)
+        self._parameter_names = tuple(parameter_names)
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, track):
+        """
+        Returns (device, parameter) for the track; either may be None.
+        """
+        if not liveobj_valid(track):
+            return None, None
+        key = live_key(track)
+        num_devices = len(track.devices)
+        entry = self._entries.get(key)
+        if entry is not None:
+            cached_num_devices, device, parameter = entry
+            if cached_num_devices == num_devices and (device is None or liveobj_valid(device)):
+                return device, parameter
+        device, parameter = self._resolve(track)
+        self._entries[key] = (num_devices, device, parameter)
+        return device, parameter
+
+    def invalidate(self, track):
+        if track is not None:
+            self._entries.pop(live_key(track), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def retain(self, tracks):
+        """
+        Drops every entry except those for `tracks`.
+        """
+        keep = set(live_key(track) for track in tracks)
+        for key in [key for key in self._entries if key not in keep]:
+            del self._entries[key]
+
+    def _resolve(self, track):
+        device = None
+        for candidate in reversed(list(track.devices)):
+            if candidate.name in self._device_names:
+                device = candidate
+                break
+        if device is None:
+            return None, None
+        parameters = dict((parameter.name, parameter) for parameter in device.parameters)
+        for name in self._parameter_names:
+            if name in parameters:
+                return device, parameters[name]
+        return device, None
@@ -0,0 +1,150 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import Live
+from _Framework.ButtonElement import ButtonElement
+from _Framework.EncoderElement import EncoderElement
+from _Framework.InputControlElement import MIDI_CC_TYPE, MIDI_NOTE_TYPE
+from _Framework.SliderElement import SliderElement
+from ableton.v2.base import liveobj_valid
+
+
+class LedButtonElement(ButtonElement):
+    """
+    A button whose LED output goes through a shared LedOutput instead of
+    straight to the MIDI port.
+    """
+
+    def __init__(self, led_output, *a, **k):
+        super(LedButtonElement, self).__init__(*a, **k)
+        self._led_output = led_output
+
+    def send_midi(self, message):
+        self._led_output.request(message)
+        return True
+
+
+def button(cc, name=None, led_output=None):
+    channel = cc[1]
+    cc = cc[0]
+    if led_output is not None:
+        rv = LedButtonElement(led_output, True, MIDI_NOTE_TYPE, channel, cc)
+    else:
+        rv = ButtonElement(True, MIDI_NOTE_TYPE, channel, cc)
+    if name is not None:
+        rv.name = name
+    return rv
+
+def fader(cc):
+    channel = cc[1]
+    cc = cc[0]
+    return SliderElement(MIDI_CC_TYPE, channel, cc)
+
+def knob(cc):
+    channel = cc[1]
+    cc = cc[0]
+    return EncoderElement(MIDI_CC_TYPE, channel, cc, Live.MidiMap.MapMode.absolute)
+
+def encoder(cc, map_mode=Live.MidiMap.MapMode.absolute, encoder_sensitivity=1.0):
+    channel = cc[1]
+    cc = cc[0]
+    return EncoderElement(MIDI_CC_TYPE, channel, cc, map_mode, encoder_sensitivity=encoder_sensitivity)
+
+
+class CoalescingEncoder(object):
+    """
+    Relative (two's complement) encoder that drives a parameter from Python
+    instead of through Live's MIDI map. Deltas received within a tick are
+    summed and written to the parameter once, when the surface calls `flush`.
+
+    `sensitivity` is the share of the parameter's range moved per detent, in
+    units of 1/STEPS_PER_RANGE. With `acceleration` > 0 each extra detent in
+    the same tick scales the step up, so fast spins cover more range, up to
+    MAX_ACCELERATION times the unaccelerated step.
+    """
+    STEPS_PER_RANGE = 500.0
+    MAX_ACCELERATION = 4.0
+
+    def __init__(self, cc, sensitivity=1.0, acceleration=0.0):
+        self.sensitivity = sensitivity
+        self.acceleration = acceleration
+        self._parameter = None
+        self._delta = 0
+        self._events = 0
+        self._encoder = encoder(cc, Live.MidiMap.MapMode.relative_smooth_two_compliment)
+        self._encoder.add_value_listener(self._on_value)
+
+    @property
+    def parameter(self):
+        return self._parameter
+
+    def connect_to(self, parameter):
+        self._parameter = parameter
+        self._delta = 0
+        self._events = 0
+
+    def release_parameter(self):
+        self._parameter = None
+        self._delta = 0
+        self._events = 0
+
+    def _on_value(self, value):
+        self._delta += value if value < 64 else value - 128
+        self._events += 1
+
+    def flush(self):
+        """
+        Applies the deltas gathered since the last flush as a single write.
+        Returns whether a write was made.
+        """
+        delta, events = self._delta, self._events
+        self._delta = 0
+        self._events = 0
+        parameter = self._parameter
+        if delta == 0 or not liveobj_valid(parameter):
+            return False
+        steps = delta * min(1.0 + self.acceleration * (events - 1), self.MAX_ACCELERATION)
+        if parameter.is_quantized:
+            value = parameter.value + int(round(steps))
+        else:
+            value = parameter.value + steps * self.sensitivity * (parameter.max - parameter.min) / self.STEPS_PER_RANGE
+        value = max(parameter.min, min(parameter.max, value))
+        if value == parameter.value:
+            return False
+        parameter.value = value
+        return True
+
+
+class ElementRegistry(object):
+    """
+    Hands out one element per (type, channel, identifier) for the lifetime of
+    the surface, so rebinding a control never allocates a new element.
+    """
+
+    def __init__(self, led_output=None):
+        self._elements = {}
+        self._led_output = led_output
+
+    def __len__(self):
+        return len(self._elements)
+
+    def _get(self, kind, msg_type, cc, factory):
+        key = (kind, msg_type, cc[1], cc[0])
+        element = self._elements.get(key)
+        if element is None:
+            element = factory()
+            self._elements[key] = element
+        return element
+
+    def button(self, cc, name=None):
+        return self._get("button", MIDI_NOTE_TYPE, cc, lambda: button(cc, name, self._led_output))
+
+    def fader(self, cc):
+        return self._get("fader", MIDI_CC_TYPE, cc, lambda: fader(cc))
+
+    def knob(self, cc):
+        return self._get("knob", MIDI_CC_TYPE, cc, lambda: knob(cc))
+
+    def encoder(self, cc, map_mode=Live.MidiMap.MapMode.absolute, encoder_sensitivity=1.0):
+        return self._get("encoder", MIDI_CC_TYPE, cc, lambda: encoder(cc, map_mode, encoder_sensitivity))
+
+    def coalescing_encoder(self, cc, sensitivity=1.0, acceleration=0.0):
+        return self._get("coalescing_encoder", MIDI_CC_TYPE, cc, lambda: CoalescingEncoder(cc, sensitivity, acceleration))
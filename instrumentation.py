@@ -0,0 +1,128 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import time
+from functools import wraps
+
+# Read once, when handlers are decorated. When disabled, `instrumented`
+# returns the handler unchanged, so there is no overhead at all.
+INSTRUMENTATION_ENABLED = os.environ.get('XONEK2_INSTRUMENTATION', '') not in ('', '0')
+NUM_BUCKETS = 24 # Bucket n holds calls taking [2^(n-1), 2^n) microseconds
+
+
+class HandlerStats(object):
+    """
+    Call count, total/max time and a log2-bucketed latency histogram for one
+    handler.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.buckets[min(int(elapsed * 1e6).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """
+        Upper bound, in seconds, of the bucket holding the given percentile.
+        """
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return (1 << index) / 1e6
+        return 0.0
+
+    def reset(self):
+        self.__init__(self.name)
+
+
+class Instrumentation(object):
+
+    def __init__(self):
+        self._stats = {}
+
+    def stats(self, name):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = HandlerStats(name)
+        return stats
+
+    def all_stats(self):
+        return sorted(self._stats.values(), key=lambda s: s.total, reverse=True)
+
+    def reset(self):
+        for stats in self._stats.values():
+            stats.reset()
+
+    def summary(self, limit=3):
+        """
+        One line for the status bar: the handlers with the most total time.
+        """
+        active = [s for s in self.all_stats() if s.count][:limit]
+        if not active:
+            return 'No handler calls recorded'
+        return ' | '.join('%s %dx avg %.2fms max %.2fms' % (
+            s.name, s.count, s.mean * 1e3, s.max * 1e3) for s in active)
+
+    def report(self):
+        lines = []
+        for s in self.all_stats():
+            if not s.count:
+                continue
+            lines.append('%s: %d calls, total %.2fms, mean %.1fus, p99 <%.0fus, max %.1fus' % (
+                s.name, s.count, s.total * 1e3, s.mean * 1e6, s.percentile(0.99) * 1e6, s.max * 1e6))
+            for index, count in enumerate(s.buckets):
+                if count:
+                    low = (1 << (index - 1)) if index else 0
+                    lines.append('  %8dus - %8dus  %d' % (low, 1 << index, count))
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, 'w') as f:
+            f.write(self.report())
+            f.write('\n')
+
+
+instrumentation = Instrumentation()
+
+
+def report_file_name(directory, now=None):
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now))
+    return os.path.join(directory, 'xonek2-%s.handlers.txt' % stamp)
+
+
+def instrumented(name):
+    """
+    Decorator recording call count and latency of a handler under `name`.
+    """
+    def decorator(fn):
+        if not INSTRUMENTATION_ENABLED:
+            return fn
+        stats = instrumentation.stats(name)
+        clock = time.perf_counter
+
+        @wraps(fn)
+        def wrapper(*a, **k):
+            start = clock()
+            try:
+                return fn(*a, **k)
+            finally:
+                stats.record(clock() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,55 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from collections import OrderedDict
+
+LED_MESSAGES_PER_TICK = 24
+
+
+class LedOutput(object):
+    """
+    Buffers LED messages for the K2s. Keeps a shadow of what each LED was last
+    sent, keyed by (status, identifier) so both controllers' channels are
+    tracked separately.
+
+    Requests that match the shadow are dropped. Repeated requests for one LED
+    within a tick collapse into the last one. `flush` sends at most
+    `messages_per_tick` messages and keeps the rest for the next tick.
+    """
+
+    def __init__(self, send_midi, messages_per_tick=LED_MESSAGES_PER_TICK):
+        self._send_midi = send_midi
+        self.messages_per_tick = messages_per_tick
+        self._shadow = {}
+        self._pending = OrderedDict()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def request(self, message):
+        status, identifier, value = message
+        key = (status, identifier)
+        if self._shadow.get(key) == value:
+            self._pending.pop(key, None)
+        else:
+            self._pending[key] = value
+
+    def invalidate(self):
+        """
+        Forgets the shadow state, e.g. after the hardware was reconnected, so
+        the next request for every LED is sent again.
+        """
+        self._shadow.clear()
+
+    def flush(self):
+        """
+        Sends up to `messages_per_tick` pending messages and returns how many
+        were sent.
+        """
+        sent = 0
+        budget = self.messages_per_tick
+        while self._pending and (budget is None or sent < budget):
+            (status, identifier), value = self._pending.popitem(last=False)
+            self._send_midi((status, identifier, value))
+            self._shadow[(status, identifier)] = value
+            sent += 1
+        return sent
@@ -0,0 +1,134 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import threading
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {
+    DEBUG: "DEBUG",
+    INFO: "INFO",
+    WARNING: "WARNING",
+    ERROR: "ERROR",
+}
+
+LOG_LEVEL = INFO
+RING_SIZE = 1024
+FLUSH_INTERVAL = 0.25 # Seconds between background formatting passes
+
+
+class RingLogger(object):
+    """
+    Leveled logger for the whole script. Calls below the current level return
+    straight away. Enabled records are stored unformatted in a fixed-size ring
+    buffer, and a background thread formats them. The formatted lines are
+    handed to the sink (Live's log) by `flush`, which the surface calls from
+    Live's main thread once per tick, since Live's API must not be called
+    from other threads.
+
+    Arguments are formatted off the main thread, so pass plain values (names,
+    numbers) rather than Live objects.
+    """
+
+    def __init__(self, name, level=LOG_LEVEL, capacity=RING_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.name = name
+        self.level = level
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._records = deque(maxlen=capacity)
+        self._lines = deque()
+        self._sink = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopping = False
+
+    def is_enabled_for(self, level):
+        return level >= self.level
+
+    def log(self, level, msg, *args):
+        if level < self.level:
+            return
+        if len(self._records) == self._records.maxlen:
+            self.dropped += 1
+        self._records.append((level, msg, args))
+
+    def debug(self, msg, *args):
+        if DEBUG >= self.level:
+            self.log(DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        if INFO >= self.level:
+            self.log(INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        if WARNING >= self.level:
+            self.log(WARNING, msg, *args)
+
+    def error(self, msg, *args):
+        if ERROR >= self.level:
+            self.log(ERROR, msg, *args)
+
+    def start(self, sink):
+        """
+        Sets where formatted records go and starts the flush thread.
+        """
+        self._sink = sink
+        if self._thread is None:
+            self._stopping = False
+            self._wakeup.clear()
+            self._thread = threading.Thread(target=self._run, name="%s-log" % self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stops the formatting thread and writes out whatever is still buffered.
+        Call from the main thread.
+        """
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            thread.join(1.0)
+        self._format_records()
+        self.flush()
+        self._sink = None
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._format_records()
+
+    def _format_records(self):
+        dropped, self.dropped = self.dropped, 0
+        if dropped:
+            self._lines.append("%s WARNING: dropped %d log records" % (self.name, dropped))
+        while self._records:
+            try:
+                level, msg, args = self._records.popleft()
+            except IndexError:
+                break
+            try:
+                text = msg % args if args else msg
+            except Exception as e:
+                text = "%r %r (format error: %s)" % (msg, args, e)
+            self._lines.append("%s %s: %s" % (self.name, LEVEL_NAMES.get(level, level), text))
+
+    def flush(self):
+        """
+        Hands the lines formatted so far to the sink. Call from the main thread.
+        """
+        sink = self._sink
+        if sink is None:
+            return
+        while self._lines:
+            try:
+                line = self._lines.popleft()
+            except IndexError:
+                break
+            sink(line)
+
+
+logger = RingLogger("XoneK2")
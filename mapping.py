@@ -0,0 +1,238 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from collections import namedtuple
+from types import MappingProxyType
+from _Framework.InputControlElement import MIDI_CC_TYPE, MIDI_NOTE_TYPE
+
+# Channels are counted from 0. This is what people would normally call
+# channel 15.
+R_CHANNEL = 14 # Right-side controller
+L_CHANNEL = 13 # Left-side controller
+
+# Layer 1
+MIDI_MAPPING = {
+    "LAYER1": { # Red layer
+        "ENCODERS"        : [0, 1, 2, 3],
+        "PUSH_ENCODERS"   : [52, 53, 54, 55],
+        "KNOBS1"          : [4, 5, 6, 7],
+        "KNOBS2"          : [8, 9, 10, 11],
+        "KNOBS3"          : [12, 13, 14, 15],
+        "BUTTONS1"        : [48, 49, 50, 51],
+        "BUTTONS2"        : [44, 45, 46, 47],
+        "BUTTONS3"        : [40, 41, 42, 43],
+        "GRID1"           : [36, 37, 38, 39],
+        "GRID2"           : [32, 33, 34, 35],
+        "GRID3"           : [28, 29, 30, 31],
+        "GRID4"           : [24, 25, 26, 27],
+        "FADERS"          : [16, 17, 18, 19],
+        "ENCODER_LL"      : [20],
+        "ENCODER_LR"      : [21],
+        "PUSH_ENCODER_LL" : [13],
+        "PUSH_ENCODER_LR" : [14],
+        "BUTTON_LL"       : [12],  # DO NOT USE - RESERVED FOR LATCHING LAYERS
+        "BUTTON_LR"       : [15],
+    },
+    "LAYER2": { # Amber layer
+        "ENCODERS"        : [0x16, 0x17, 0x18, 0x19],
+        "PUSH_ENCODERS"   : [0x58, 0x59, 0x5A, 0x5B],
+        "KNOBS1"          : [0x1A, 0x1B, 0x1C, 0x1D],
+        "KNOBS2"          : [0x1E, 0x1F, 0x20, 0x21],
+        "KNOBS3"          : [0x22, 0x23, 0x24, 0x25],
+        "BUTTONS1"        : [0x54, 0x55, 0x56, 0x57],
+        "BUTTONS2"        : [0x50, 0x51, 0x52, 0x53],
+        "BUTTONS3"        : [0x4C, 0x4D, 0x4E, 0x4F],
+        "GRID1"           : [0x48, 0x49, 0x4A, 0x4B],
+        "GRID2"           : [0x44, 0x45, 0x46, 0x47],
+        "GRID3"           : [0x40, 0x41, 0x42, 0x43],
+        "GRID4"           : [0x3C, 0x3D, 0x3E, 0x3F],
+        "FADERS"          : [0x26, 0x27, 0x28, 0x29],
+        "ENCODER_LL"      : [0x2A],
+        "ENCODER_LR"      : [0x2B],
+        "PUSH_ENCODER_LL" : [0x11],
+        "PUSH_ENCODER_LR" : [0x12],
+        "BUTTON_LL"       : [0x10],  # DO NOT USE - RESERVED FOR LATCHING LAYERS
+        "BUTTON_LR"       : [0x13],
+    },
+    "LAYER3": { # Green layer
+        "ENCODERS"        : [0x2C, 0x2D, 0x2E, 0x2F],
+        "PUSH_ENCODERS"   : [0x7C, 0x7D, 0x7E, 0x7F],
+        "KNOBS1"          : [0x30, 0x31, 0x32, 0x33],
+        "KNOBS2"          : [0x34, 0x35, 0x36, 0x37],
+        "KNOBS3"          : [0x38, 0x39, 0x3A, 0x3B],
+        "BUTTONS1"        : [0x78, 0x79, 0x7A, 0x7B],
+        "BUTTONS2"        : [0x74, 0x75, 0x76, 0x77],
+        "BUTTONS3"        : [0x70, 0x71, 0x72, 0x73],
+        "GRID1"           : [0x6C, 0x6D, 0x6E, 0x6F],
+        "GRID2"           : [0x68, 0x69, 0x6A, 0x6B],
+        "GRID3"           : [0x64, 0x65, 0x66, 0x67],
+        "GRID4"           : [0x60, 0x61, 0x62, 0x63],
+        "FADERS"          : [0x3C, 0x3D, 0x3E, 0x3F],
+        "ENCODER_LL"      : [0x44],
+        "ENCODER_LR"      : [0x45],
+        "PUSH_ENCODER_LL" : [0x15],
+        "PUSH_ENCODER_LR" : [0x16],
+        "BUTTON_LL"       : [0x14],  # DO NOT USE - RESERVED FOR LATCHING LAYERS
+        "BUTTON_LR"       : [0x17],
+    }
+}
+
+RED_LAYER   = "LAYER1"
+AMBER_LAYER = "LAYER2"
+GREEN_LAYER = "LAYER3"
+
+# Number of chained K2s, at least 2. The first two are the usual right/left
+# pair; any further units are named U3, U4, ... on the channels below L_CHANNEL.
+NUM_UNITS = 2
+
+# Controls per strip group, i.e. the four columns of a K2
+STRIPS_PER_GROUP = 4
+
+
+def chained_units(num_units, first_channel=R_CHANNEL):
+    """
+    Returns ((name, channel), ...) for `num_units` K2s on descending channels
+    from `first_channel`. At least the right/left pair is required, since the
+    global controls live on both.
+    """
+    if num_units < 2 or num_units > first_channel + 1:
+        raise ValueError("Invalid number of units: %s" % num_units)
+    names = ["R", "L"] + ["U%d" % (n + 1) for n in range(2, num_units)]
+    return tuple((names[n], first_channel - n) for n in range(num_units))
+
+
+def strip_layout(unit_names, layers=(AMBER_LAYER, GREEN_LAYER, RED_LAYER)):
+    """
+    Returns the (unit, layer) pairs that drive each group of four strips, in
+    strip order: every unit on the first layer, then every unit on the next.
+    """
+    return tuple((unit, layer) for layer in layers for unit in unit_names)
+
+
+UNITS = chained_units(NUM_UNITS)
+
+CONTROLLER_CHANNELS = dict(UNITS)
+
+# Which unit and layer drive each group of four strips. The stock two-unit
+# setup keeps its original layout; larger rigs get one group per unit per
+# layer, i.e. 12 strips per unit: four units give 48, six give 72.
+if NUM_UNITS == 2:
+    STRIP_LAYOUT = (
+        ("R", AMBER_LAYER),
+        ("L", AMBER_LAYER),
+        ("R", GREEN_LAYER),
+        ("R", RED_LAYER),
+    )
+else:
+    STRIP_LAYOUT = strip_layout([name for name, _channel in UNITS])
+
+NUM_STRIPS = STRIPS_PER_GROUP * len(STRIP_LAYOUT)
+
+# Buttons (including encoder pushes) send notes, everything else sends CCs.
+NOTE_CONTROLS = frozenset([
+    "PUSH_ENCODERS", "BUTTONS1", "BUTTONS2", "BUTTONS3",
+    "GRID1", "GRID2", "GRID3", "GRID4",
+    "PUSH_ENCODER_LL", "PUSH_ENCODER_LR", "BUTTON_LL", "BUTTON_LR",
+])
+
+def control_msg_type(control):
+    return MIDI_NOTE_TYPE if control in NOTE_CONTROLS else MIDI_CC_TYPE
+
+def compile_control_table(mapping=MIDI_MAPPING, channels=CONTROLLER_CHANNELS):
+    """
+    Builds an immutable (controller, layer, control) -> ((cc, channel), ...)
+    table, the forward counterpart of the address table.
+    """
+    table = {}
+    for controller, channel in channels.items():
+        for layer, controls in mapping.items():
+            for control, numbers in controls.items():
+                table[(controller, layer, control)] = tuple((number, channel) for number in numbers)
+    return MappingProxyType(table)
+
+
+CONTROL_TABLE = compile_control_table()
+
+
+def midi_map(controller, layer, control, cc_index=None):
+    mapping = CONTROL_TABLE.get((controller, layer, control))
+    if mapping is None:
+        if controller not in CONTROLLER_CHANNELS:
+            raise ValueError("Invalid controller: %s" % controller)
+        if layer not in MIDI_MAPPING:
+            raise ValueError("Invalid layer: %s" % layer)
+        raise ValueError("Invalid control: %s" % control)
+    if cc_index is not None:
+        if cc_index < 0 or cc_index >= len(mapping):
+            raise ValueError("Invalid cc_index: %s" % cc_index)
+        return [mapping[cc_index]]
+    return list(mapping)
+
+def midi_map_all_layers(controller, control, cc_index=None):
+    mappings = []
+    for layer in [AMBER_LAYER, GREEN_LAYER, RED_LAYER]:
+        mappings.extend(midi_map(controller, layer, control, cc_index))
+    return mappings
+
+def strip_map(control, layout=STRIP_LAYOUT):
+    """
+    Returns one (cc, channel) per strip for a strip control, following the
+    strip layout.
+    """
+    mappings = []
+    for controller, layer in layout:
+        mappings.extend(midi_map(controller, layer, control))
+    return mappings
+
+
+# A single physical address on the K2s, resolved to the logical control it
+# belongs to. `index` is the position within the control group (e.g. which of
+# the four ENCODERS).
+ControlAddress = namedtuple("ControlAddress", ["controller", "layer", "control", "index", "msg_type", "channel", "number"])
+
+
+def compile_address_table(mapping=MIDI_MAPPING, channels=CONTROLLER_CHANNELS):
+    """
+    Builds an immutable (msg_type, channel, number) -> ControlAddress table.
+    Raises ValueError if two logical controls end up on the same address.
+    """
+    table = {}
+    for controller in sorted(channels):
+        channel = channels[controller]
+        for layer in sorted(mapping):
+            for control, numbers in mapping[layer].items():
+                msg_type = control_msg_type(control)
+                for index, number in enumerate(numbers):
+                    key = (msg_type, channel, number)
+                    address = ControlAddress(controller, layer, control, index, msg_type, channel, number)
+                    existing = table.get(key)
+                    if existing is not None and existing != address:
+                        raise ValueError("Address collision on %s: %s/%s/%s[%d] and %s/%s/%s[%d]" % (
+                            key,
+                            existing.controller, existing.layer, existing.control, existing.index,
+                            controller, layer, control, index))
+                    table[key] = address
+    return MappingProxyType(table)
+
+
+# Covers every chained unit, so a misconfigured rig (two units on the same
+# channel) fails at load time rather than with crossed controls.
+ADDRESS_TABLE = compile_address_table()
+
+
+def lookup_address(msg_type, channel, number):
+    """
+    Returns the ControlAddress bound to a MIDI address, or None.
+    """
+    return ADDRESS_TABLE.get((msg_type, channel, number))
+
+
+def layer_address(cc, layer):
+    """
+    Returns the (cc, channel) of the same physical control on another layer.
+    The K2 lights an LED in the colour of the layer whose note it receives, so
+    this is also how a button is lit red, amber or green.
+    """
+    number, channel = cc
+    address = lookup_address(MIDI_NOTE_TYPE, channel, number)
+    if address is None:
+        raise ValueError("Unknown button: %s" % (cc,))
+    return midi_map(address.controller, layer, address.control, address.index)[0]
@@ -0,0 +1,213 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import hashlib
+import json
+import marshal
+import os
+from _Framework.InputControlElement import MIDI_CC_TYPE, MIDI_NOTE_TYPE
+from .mapping import AMBER_LAYER, CONTROLLER_CHANNELS, GREEN_LAYER, MIDI_MAPPING, NUM_STRIPS, RED_LAYER, STRIP_LAYOUT, control_msg_type, midi_map, strip_map
+
+from .logger import logger
+
+MAPPING_PROFILE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+PROFILE_SUFFIX = '.json'
+CACHE_SUFFIX = '.cache'
+CACHE_VERSION = 1
+
+LAYER_NAMES = {
+    "RED": RED_LAYER,
+    "AMBER": AMBER_LAYER,
+    "GREEN": GREEN_LAYER,
+}
+
+# Strip roles a profile can assign, and the message type each one needs
+STRIP_ROLES = {
+    "FILTER_ENCODERS"      : MIDI_CC_TYPE,
+    "FILTER_RESET_BUTTONS" : MIDI_NOTE_TYPE,
+    "SENDS_A_KNOBS"        : MIDI_CC_TYPE,
+    "SENDS_B_KNOBS"        : MIDI_CC_TYPE,
+    "VOLUME_FADERS"        : MIDI_CC_TYPE,
+    "MUTE_BUTTONS"         : MIDI_NOTE_TYPE,
+    "LAUNCH_BUTTONS"       : MIDI_NOTE_TYPE,
+    "STOP_BUTTONS"         : MIDI_NOTE_TYPE,
+    "SOLO_BUTTONS"         : MIDI_NOTE_TYPE,
+    "ARM_BUTTONS"          : MIDI_NOTE_TYPE,
+}
+
+
+class MappingProfileError(ValueError):
+    pass
+
+
+class MappingProfile(object):
+    """
+    A compiled mapping profile: for each strip role, one (cc, channel) per
+    strip. `cached` tells whether it came from the compiled cache.
+    """
+
+    def __init__(self, name, roles, cached=False):
+        self.name = name
+        self.roles = roles
+        self.cached = cached
+
+    def changed_bindings(self, other):
+        """
+        Returns the (role, strip index) pairs whose address differs in `other`.
+        """
+        changed = []
+        for role in sorted(STRIP_ROLES):
+            for index, (old, new) in enumerate(zip(self.roles[role], other.roles[role])):
+                if old != new:
+                    changed.append((role, index))
+        return changed
+
+
+def profile_path(name, directory=MAPPING_PROFILE_DIRECTORY):
+    return os.path.join(directory, name + PROFILE_SUFFIX)
+
+
+def available_profiles(directory=MAPPING_PROFILE_DIRECTORY):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f[:-len(PROFILE_SUFFIX)] for f in os.listdir(directory) if f.endswith(PROFILE_SUFFIX))
+
+
+def _layer(name):
+    layer = LAYER_NAMES.get(name, name)
+    if layer not in MIDI_MAPPING:
+        raise MappingProfileError("Invalid layer: %s" % name)
+    return layer
+
+
+def _address(role, entry):
+    if not isinstance(entry, list) or len(entry) != 4:
+        raise MappingProfileError("%s: invalid entry %r, expected [controller, layer, control, index]" % (role, entry))
+    controller, layer, control, index = entry
+    if not isinstance(controller, str) or not isinstance(layer, str) or not isinstance(control, str):
+        raise MappingProfileError("%s: invalid entry %r, names must be strings" % (role, entry))
+    if isinstance(index, bool) or not isinstance(index, int) or index < 0:
+        raise MappingProfileError("%s: invalid entry %r, index must be a non-negative integer" % (role, entry))
+    try:
+        return midi_map(controller, _layer(layer), control, index)[0], control
+    except ValueError as e:
+        raise MappingProfileError("%s: invalid entry %r (%s)" % (role, entry, e))
+
+
+def compile_profile(data, defaults, reserved=()):
+    """
+    Validates a parsed profile and returns {role: ((cc, channel), ...)}.
+
+    A role is either a control name, laid out over the profile's "strips"
+    (or the default strip layout), or a list of [controller, layer, control,
+    index] entries, one per strip. Roles the profile leaves out keep
+    `defaults`. Raises MappingProfileError if a role is unknown, has the
+    wrong number of strips or message type, or if an address is used twice
+    or is one of the `reserved` (msg_type, cc, channel) addresses.
+    """
+    if not isinstance(data, dict):
+        raise MappingProfileError("A profile must be a JSON object")
+    roles = data.get("roles", {})
+    if not isinstance(roles, dict):
+        raise MappingProfileError("\"roles\" must be a JSON object")
+    for role in roles:
+        if role not in STRIP_ROLES:
+            raise MappingProfileError("Unknown role: %s" % role)
+    strips = data.get("strips", STRIP_LAYOUT)
+    if not isinstance(strips, (list, tuple)):
+        raise MappingProfileError("\"strips\" must be a list of [controller, layer] pairs")
+    layout = []
+    for entry in strips:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 2 or \
+           not isinstance(entry[0], str) or not isinstance(entry[1], str):
+            raise MappingProfileError("Invalid strips entry %r, expected [controller, layer]" % (entry,))
+        controller, layer = entry
+        if controller not in CONTROLLER_CHANNELS:
+            raise MappingProfileError("Invalid controller in strips: %s" % controller)
+        layout.append((controller, _layer(layer)))
+    layout = tuple(layout)
+
+    compiled = {}
+    used = dict((address, "reserved control") for address in reserved)
+    for role in sorted(STRIP_ROLES):
+        msg_type = STRIP_ROLES[role]
+        spec = roles.get(role)
+        if spec is None:
+            addresses = [tuple(a) for a in defaults[role]]
+        elif isinstance(spec, str):
+            if spec not in MIDI_MAPPING[RED_LAYER]:
+                raise MappingProfileError("%s: invalid control %s" % (role, spec))
+            if control_msg_type(spec) != msg_type:
+                raise MappingProfileError("%s: %s sends the wrong message type" % (role, spec))
+            addresses = strip_map(spec, layout)
+        elif isinstance(spec, list):
+            addresses = []
+            for entry in spec:
+                address, control = _address(role, entry)
+                if control_msg_type(control) != msg_type:
+                    raise MappingProfileError("%s: %s sends the wrong message type" % (role, control))
+                addresses.append(address)
+        else:
+            raise MappingProfileError("%s: expected a control name or a list of entries, got %r" % (role, spec))
+        if len(addresses) != NUM_STRIPS:
+            raise MappingProfileError("%s: %d strips assigned, expected %d" % (role, len(addresses), NUM_STRIPS))
+        for index, (cc, channel) in enumerate(addresses):
+            key = (msg_type, cc, channel)
+            if key in used:
+                raise MappingProfileError("%s[%d]: address %s already used by %s" % (role, index, key[1:], used[key]))
+            used[key] = "%s[%d]" % (role, index)
+        compiled[role] = tuple((cc, channel) for cc, channel in addresses)
+    return compiled
+
+
+def _digest(source, defaults, reserved):
+    # Anything compile_profile depends on besides the file itself
+    context = repr((CACHE_VERSION, sorted(CONTROLLER_CHANNELS.items()), STRIP_LAYOUT, NUM_STRIPS,
+                    sorted((role, tuple(map(tuple, addresses))) for role, addresses in defaults.items()),
+                    sorted(reserved)))
+    return hashlib.sha1(source + context.encode('utf-8')).hexdigest()
+
+
+def _read_cache(path, digest):
+    try:
+        with open(path, 'rb') as f:
+            version, cached_digest, roles = marshal.load(f)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != CACHE_VERSION or cached_digest != digest:
+        return None
+    return roles
+
+
+def _write_cache(path, digest, roles):
+    try:
+        with open(path, 'wb') as f:
+            marshal.dump((CACHE_VERSION, digest, roles), f)
+    except (IOError, OSError) as e:
+        # A read-only script folder only costs a compile per load
+        logger.warning('Could not write mapping profile cache %s: %s', path, e)
+
+
+def load_mapping_profile(name, defaults, reserved=(), directory=MAPPING_PROFILE_DIRECTORY):
+    """
+    Loads a profile from `directory`. The compiled form is cached next to the
+    JSON file and reused as long as the file and the mapping it was compiled
+    against are unchanged.
+    """
+    path = profile_path(name, directory)
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+    except (IOError, OSError) as e:
+        raise MappingProfileError("Cannot read mapping profile %s: %s" % (path, e))
+    reserved = [tuple(address) for address in reserved]
+    digest = _digest(source, defaults, reserved)
+    cache_path = path[:-len(PROFILE_SUFFIX)] + CACHE_SUFFIX
+    roles = _read_cache(cache_path, digest)
+    if roles is not None:
+        return MappingProfile(name, roles, cached=True)
+    try:
+        data = json.loads(source.decode('utf-8'))
+    except ValueError as e:
+        raise MappingProfileError("Invalid JSON in %s: %s" % (path, e))
+    roles = compile_profile(data, defaults, reserved)
+    _write_cache(cache_path, digest, roles)
+    return MappingProfile(name, roles)
@@ -0,0 +1,123 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import struct
+import time
+
+TRACE_MAGIC = b'XK2T'
+TRACE_VERSION = 1
+# magic, version, wall-clock start time
+HEADER = struct.Struct('<4sBd')
+# seconds since start, status (message kind), channel, number, value
+RECORD = struct.Struct('<dBBBB')
+TRACE_BUFFER_RECORDS = 4096
+TICK_INTERVAL = 0.1 # Seconds between update_display calls in Live
+
+
+def trace_file_name(directory, now=None):
+    """
+    Returns a timestamped trace path in `directory` that does not exist yet;
+    traces started within the same second get a -2, -3, ... suffix.
+    """
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now))
+    path = os.path.join(directory, 'xonek2-%s.k2trace' % stamp)
+    suffix = 2
+    while os.path.exists(path):
+        path = os.path.join(directory, 'xonek2-%s-%d.k2trace' % (stamp, suffix))
+        suffix += 1
+    return path
+
+
+class TraceRecorder(object):
+    """
+    Records incoming MIDI into a compact binary file. Records are packed into
+    a preallocated buffer and appended to the file whenever the buffer fills
+    up, or on flush/close, so recording never allocates per message.
+    """
+
+    def __init__(self, path, capacity=TRACE_BUFFER_RECORDS, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._buffer = bytearray(capacity * RECORD.size)
+        self._capacity = capacity
+        self._count = 0
+        self.recorded = 0
+        self._start = clock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Exclusive, so an existing trace is never appended to
+        self._file = open(path, 'xb')
+        self._file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, self._start))
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    def record(self, midi_bytes):
+        if self._file is None or len(midi_bytes) != 3:
+            return
+        status, number, value = midi_bytes
+        RECORD.pack_into(self._buffer, self._count * RECORD.size,
+                         self._clock() - self._start, status & 0xF0, status & 0x0F, number, value)
+        self._count += 1
+        self.recorded += 1
+        if self._count == self._capacity:
+            self.flush()
+
+    def flush(self):
+        if self._file is None or self._count == 0:
+            return
+        self._file.write(memoryview(self._buffer)[:self._count * RECORD.size])
+        self._file.flush()
+        self._count = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+def read_trace(path):
+    """
+    Yields (timestamp, status, channel, number, value) for every record in a
+    trace file. Timestamps are seconds since the start of the recording.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = HEADER.unpack_from(data, 0)
+    if header[0] != TRACE_MAGIC:
+        raise ValueError('Not a K2 trace: %s' % path)
+    if header[1] != TRACE_VERSION:
+        raise ValueError('Unsupported trace version %d: %s' % (header[1], path))
+    end = len(data) - (len(data) - HEADER.size) % RECORD.size
+    for offset in range(HEADER.size, end, RECORD.size):
+        yield RECORD.unpack_from(data, offset)
+
+
+def replay(records, receive_midi, tick=None, realtime=False, speed=1.0, tick_interval=TICK_INTERVAL):
+    """
+    Feeds trace records to `receive_midi`. Traces do not record Live's ticks,
+    so `tick` (usually update_display) is called every `tick_interval`
+    seconds of trace time, which approximates how coalescing and scheduled
+    tasks ran live. With `realtime`, messages are
+    spaced as recorded (scaled by `speed`); otherwise they go as fast as
+    possible. Returns the number of messages replayed.
+    """
+    count = 0
+    next_tick = tick_interval
+    start = time.time()
+    for timestamp, status, channel, number, value in records:
+        if tick is not None:
+            while timestamp >= next_tick:
+                tick()
+                next_tick += tick_interval
+        if realtime:
+            delay = timestamp / speed - (time.time() - start)
+            if delay > 0:
+                time.sleep(delay)
+        receive_midi((status | channel, number, value))
+        count += 1
+    if tick is not None:
+        tick()
+    return count
@@ -2,38 +2,138 @@ from __future__ import absolute_import, print_function, unicode_literals
 from builtins import map, range
 from _Framework.MixerComponent import MixerComponent as MixerComponentBase
 from .track_filter import TrackFilterComponent
+from .device_cache import DeviceLookupCache, FILTER_DEVICE_NAMES, FILTER_PARAMETER_NAMES
 from _Framework.Control import ButtonControl, control_list
+from _Framework.SubjectSlot import subject_slot, subject_slot_group
+from _Framework import Task
 from ableton.v2.base import liveobj_valid
 from .channel_strip import ChannelStripComponent
+from .static_tracks import StaticTrackMatcher, exact
+from .parameter_batch import ParameterBatch
+from .volume_limiter import VolumeLimiter, MAX_ALLOWED_VOLUME
+from .util import live_key
 
-import logging
-
-logger = logging.getLogger("XoneK2")
+from .logger import logger
+from .instrumentation import instrumented
 
 class MixerComponent(MixerComponentBase):
     new_track_button = control_list(ButtonControl)
 
     RESERVED_TRACK = 'Utilities'
-    STATIC_TRACKS = {
-        'Maschine': {},
-        'Instruments': {},
-        'Loopers': {},
-        RESERVED_TRACK: {}, # Dummy track for now until we need to expand static tracks
-    }
-
-    def __init__(self, num_tracks, *a, **k):
-        self._track_filters = [TrackFilterComponent() for _ in range(num_tracks)]
+    NEW_TRACK_INPUT_ROUTING = 'Instruments'
+    NEVER_UNARM_TRACK = 'MIDI Sender'
+    # Static tracks are pinned to the first strips, in this order. Rules can be
+    # exact(...), substring(...) or regex(...) from static_tracks; plain strings
+    # are exact names and '/text/' is a substring match.
+    STATIC_TRACKS = (
+        exact('Maschine'),
+        exact('Instruments'),
+        exact('Loopers'),
+        exact(RESERVED_TRACK), # Dummy track for now until we need to expand static tracks
+    )
+    # Volume ceiling per track name; other tracks are held at MAX_ALLOWED_VOLUME
+    # (0db) and None disables the ceiling for a track.
+    VOLUME_LIMIT_ENABLED = True
+    VOLUME_CEILINGS = {}
+
+    def __init__(self, num_tracks, filter_device_names=FILTER_DEVICE_NAMES, filter_parameter_names=FILTER_PARAMETER_NAMES, *a, **k):
+        # Shared so a track that moves between strips keeps its resolved device
+        self._device_cache = DeviceLookupCache(filter_device_names, filter_parameter_names)
+        self._track_filters = [TrackFilterComponent(device_cache=self._device_cache,
+                                                    reset_scheduler=self._schedule_filter_reset,
+                                                    resolve_scheduler=self._schedule_filter_resolve)
+                               for _ in range(num_tracks)]
+        self._volume_limiter = VolumeLimiter(self.VOLUME_CEILINGS, MAX_ALLOWED_VOLUME,
+                                             enabled=self.VOLUME_LIMIT_ENABLED,
+                                             scheduler=self._schedule_volume_limit)
+        self._limit_task = None
+        self._pending_resolves = []
+        self._resolve_task = None
+        self._ordered_tracks = None
+        self._partition = None
+        self._bank_offset = 0
+        self._static_matcher = StaticTrackMatcher(self.STATIC_TRACKS)
         (super(MixerComponent, self).__init__)(num_tracks, *a, **k)
         list(map(self.register_components, self._track_filters))
         self.set_new_track_button = self.new_track_button.set_control_element
+        self._on_visible_tracks_changed.subject = self.song()
+        self._on_track_name_changed.replace_subjects(self.song().visible_tracks)
+        self._armed_tracks = {}
+        self._routing_type_indices = {}
+        self._on_tracks_changed.subject = self.song()
+        self._on_tracks_changed()
+        self._reset_batch = ParameterBatch()
+        self._reset_task = self._tasks.add(Task.run(self._flush_filter_resets))
+        self._reset_task.kill()
+        self._resolve_task = self._tasks.add(Task.run(self._resolve_pending_filters))
+        if not self._pending_resolves:
+            self._resolve_task.kill()
+        self._limit_task = self._tasks.add(Task.run(self._apply_volume_limit))
+        self._limit_task.kill()
 
     def _create_strip(self):
-        return ChannelStripComponent()
+        return ChannelStripComponent(volume_limiter=self._volume_limiter)
 
     def track_filter(self, index):
         return self._track_filters[index]
 
+    def _schedule_filter_reset(self, track_filter):
+        # Pressing a reset while another strip's reset is held resets every strip
+        if any(f.reset_held for f in self._track_filters if f is not track_filter):
+            track_filters = self._track_filters
+        else:
+            track_filters = [track_filter]
+        for f in track_filters:
+            f.collect_reset(self._reset_batch)
+        if self._reset_task.is_killed:
+            self._reset_task.restart()
+
+    def _schedule_filter_resolve(self, track_filter):
+        if track_filter not in self._pending_resolves:
+            self._pending_resolves.append(track_filter)
+        # Filters assigned while the base class is still initializing are
+        # picked up when the task is created.
+        if self._resolve_task is not None and self._resolve_task.is_killed:
+            self._resolve_task.restart()
+
+    def _resolve_pending_filters(self):
+        pending, self._pending_resolves = self._pending_resolves, []
+        for track_filter in pending:
+            track_filter.resolve_device()
+
+    def _schedule_volume_limit(self):
+        if self._limit_task is not None and self._limit_task.is_killed:
+            self._limit_task.restart()
+
+    def _apply_volume_limit(self):
+        writes = self._volume_limiter.apply()
+        if writes:
+            logger.info('Volume limit: %d tracks pulled back', writes)
+        return writes
+
+    @property
+    def volume_limit_enabled(self):
+        return self._volume_limiter.enabled
+
+    def set_volume_limit_enabled(self, enabled):
+        self._volume_limiter.enabled = enabled
+        self._update_volume_ceilings()
+
+    def set_volume_ceiling(self, track_name, ceiling):
+        self._volume_limiter.set_ceiling(track_name, ceiling)
+        self._update_volume_ceilings()
+
+    def _update_volume_ceilings(self):
+        for strip in self._channel_strips:
+            strip.update_volume_ceiling()
+
+    def _flush_filter_resets(self):
+        writes = self._reset_batch.apply()
+        logger.info('Filter reset: %d parameter writes', writes)
+        return writes
+
     @new_track_button.pressed
+    @instrumented("MixerComponent.new_track_button_pressed")
     def new_track_button_pressed(self, _button):
         track = self.song().create_audio_track()
         logger.info('New track created: %s', track.name)
@@ -41,18 +141,51 @@ class MixerComponent(MixerComponentBase):
         if not track.can_be_armed:
             return
 
-        for i in range(len(track.available_input_routing_types)):
-            if track.available_input_routing_types[i].display_name == 'Instruments':
-                track.input_routing_type = track.available_input_routing_types[i]
-                break
+        routing_type = self._input_routing_type(track, self.NEW_TRACK_INPUT_ROUTING)
+        if routing_type is not None:
+            track.input_routing_type = routing_type
 
         track.arm = True
+        self._armed_tracks[live_key(track)] = track
 
-        all_tracks = self.tracks(self.song())
-        except_midi_and_new_track = filter(lambda t: t != track and t.name != 'MIDI Sender', all_tracks)
+        # Only tracks that are actually armed get a write
+        except_midi_and_new_track = [t for t in self._armed_tracks.values()
+                                     if t != track and t.name != self.NEVER_UNARM_TRACK]
         self.unarm_tracks(except_midi_and_new_track)
 
+    def _input_routing_type(self, track, name):
+        # The list is rebuilt when tracks come and go (other tracks are
+        # routing sources), so the cached index is checked before use.
+        routing_types = track.available_input_routing_types
+        index = self._routing_type_indices.get(name)
+        if index is not None and index < len(routing_types) and routing_types[index].display_name == name:
+            return routing_types[index]
+        for index, routing_type in enumerate(routing_types):
+            if routing_type.display_name == name:
+                self._routing_type_indices[name] = index
+                return routing_type
+        return None
+
+    @subject_slot("tracks")
+    def _on_tracks_changed(self):
+        tracks = [t for t in self.tracks(self.song()) if t.can_be_armed]
+        self._on_track_arm_changed.replace_subjects(tracks)
+        self._armed_tracks = dict((live_key(t), t) for t in tracks if t.arm)
 
+    @subject_slot_group("arm")
+    def _on_track_arm_changed(self, track):
+        if not liveobj_valid(track):
+            return
+        if track.arm:
+            self._armed_tracks[live_key(track)] = track
+        else:
+            self._armed_tracks.pop(live_key(track), None)
+
+    @property
+    def armed_tracks(self):
+        return list(self._armed_tracks.values())
+
+    @instrumented("MixerComponent._reassign_tracks")
     def _reassign_tracks(self):
         super(MixerComponent, self)._reassign_tracks()
         tracks = self.tracks_to_use()
@@ -62,33 +195,106 @@ class MixerComponent(MixerComponentBase):
             if len(self._track_filters) > index:
                 self._track_filters[index].set_track(track)
 
+    def snapshot_parameters(self):
+        """
+        The parameters a mixer snapshot covers: volume, sends A and B and the
+        filter device of every track currently on a strip.
+        """
+        parameters = []
+        for strip in self._channel_strips:
+            track = strip._track
+            if track == None or not liveobj_valid(track):
+                continue
+            mixer_device = track.mixer_device
+            parameters.append(mixer_device.volume)
+            parameters.extend(list(mixer_device.sends)[:2])
+            device, _parameter = self._device_cache.lookup(track)
+            if device != None:
+                # The first parameter is "Device On", which snapshots leave alone
+                parameters.extend(p for p in list(device.parameters)[1:] if p.state in [0, 1])
+        return parameters
+
     def is_static_track(self, track):
-        def match(pattern):
-            if track.name == pattern:
-                return True
-            if pattern.startswith('/') and pattern.endswith('/'):
-                pattern = pattern[2:-2]
-                return pattern in track.name
-            else:
-                return False
+        return self._static_matcher.rank(track.name) is not None
+
+    def invalidate_track_order(self):
+        self._ordered_tracks = None
+        self._partition = None
 
-        return any(map(lambda pattern: match(pattern), self.STATIC_TRACKS.keys()))
+    def on_track_list_changed(self):
+        self.invalidate_track_order()
+        super(MixerComponent, self).on_track_list_changed()
+
+    @subject_slot("visible_tracks")
+    def _on_visible_tracks_changed(self):
+        self.invalidate_track_order()
+        self._on_track_name_changed.replace_subjects(self.song().visible_tracks)
+
+    @subject_slot_group("name")
+    def _on_track_name_changed(self, _track):
+        self.invalidate_track_order()
+        # Ceilings are configured by track name
+        self._update_volume_ceilings()
 
     def tracks_to_use(self):
-        static_tracks = []
-        dynamic_tracks = []
-
-        for track in super(MixerComponent, self).tracks_to_use():
-            if self.is_static_track(track):
-                # logger.info('Static track: %s', track.name)
-                if track.name == self.RESERVED_TRACK:
-                    static_tracks.append(track)
-                else:
-                    static_tracks.insert(0, track)
-            else:
-                dynamic_tracks.append(track)
-
-        return static_tracks + dynamic_tracks
+        # Static tracks, then the dynamic tracks from the current bank on.
+        # Cached until the track list, track visibility, a track name or the
+        # bank changes.
+        if self._ordered_tracks is None:
+            static_tracks, dynamic_tracks = self._track_partition()
+            self._ordered_tracks = static_tracks + dynamic_tracks[self._bank_offset:]
+        return self._ordered_tracks
+
+    def _track_partition(self):
+        if self._partition is None:
+            static_tracks, dynamic_tracks = self._static_matcher.partition(super(MixerComponent, self).tracks_to_use())
+            self._partition = (tuple(static_tracks), tuple(dynamic_tracks))
+            self._bank_offset = self._clamp_bank_offset(self._bank_offset)
+        return self._partition
+
+    @property
+    def bank_size(self):
+        """
+        Number of strips left for dynamic tracks once the static ones are pinned.
+        """
+        static_tracks, _dynamic_tracks = self._track_partition()
+        return max(1, len(self._channel_strips) - len(static_tracks))
+
+    @property
+    def bank_offset(self):
+        return self._bank_offset
+
+    def num_dynamic_tracks(self):
+        return len(self._track_partition()[1])
+
+    def _clamp_bank_offset(self, offset):
+        # Offsets stay on page boundaries, the last one being the start of the
+        # last (possibly partial) page.
+        static_tracks, dynamic_tracks = self._partition
+        size = max(1, len(self._channel_strips) - len(static_tracks))
+        last_page = max(0, (len(dynamic_tracks) - 1) // size * size)
+        return max(0, min(offset // size * size, last_page))
+
+    def set_bank_offset(self, offset):
+        """
+        Pages the dynamic tracks so the first dynamic strip shows the track at
+        `offset`. Only the newly visible tracks get strip listeners; the
+        device cache keeps the current bank and its neighbours.
+        """
+        self._track_partition()
+        offset = self._clamp_bank_offset(offset)
+        if offset == self._bank_offset:
+            return False
+        self._bank_offset = offset
+        self._ordered_tracks = None
+        self._reassign_tracks()
+        size = self.bank_size
+        dynamic_tracks = self._partition[1]
+        self._device_cache.retain(self._partition[0] + dynamic_tracks[max(0, offset - size):offset + 2 * size])
+        return True
+
+    def scroll_bank(self, pages):
+        return self.set_bank_offset(self._bank_offset + pages * self.bank_size)
 
     def toggle_fold(self, track):
         if is_group_track(track):
@@ -0,0 +1,185 @@
+"""
+Floods an offline XoneK2 with synthetic K2 traffic and reports per-message
+handling latency, Live API calls, MIDI map rebuilds and outgoing MIDI.
+
+    python offline/bench.py
+    python offline/bench.py --tracks 200 --scenario fader_sweep --scenario encoder_spin
+
+Runs without Live: the script is loaded on top of the fakes in this
+directory (see harness.py).
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+import argparse
+import os
+import time
+
+import harness
+from fake_live import api_calls, reset_api_calls
+
+NOTE_ON = 0x90
+CC = 0xB0
+MESSAGES_PER_TICK = 20
+
+
+def note(address, value):
+    number, channel = address
+    return (NOTE_ON | channel, number, value)
+
+
+def cc(address, value):
+    number, channel = address
+    return (CC | channel, number, value)
+
+
+def press(address):
+    return [note(address, 127), note(address, 0)]
+
+
+def fader_sweep(xone, repeat):
+    for _ in range(repeat):
+        for address in xone.VOLUME_FADERS:
+            for value in list(range(0, 128, 2)) + list(range(127, -1, -2)):
+                yield cc(address, value)
+
+
+def encoder_spin(xone, repeat):
+    for _ in range(repeat):
+        for address in xone.FILTER_ENCODERS:
+            for _ in range(32):
+                yield cc(address, 127) # -1
+            for _ in range(32):
+                yield cc(address, 1)   # +1
+
+
+def layer_switch(xone, repeat):
+    for _ in range(repeat * 10):
+        for address in xone.LAYER_SWITCH_BUTTONS:
+            for message in press(address):
+                yield message
+
+
+def filter_reset(xone, repeat):
+    for _ in range(repeat * 4):
+        for address in xone.FILTER_RESET_BUTTONS:
+            for message in press(address):
+                yield message
+
+
+def track_creation(xone, repeat):
+    for _ in range(repeat * 4):
+        for message in press(xone.NEW_TRACK_BUTTON[0]):
+            yield message
+
+
+SCENARIOS = [
+    ('fader_sweep', fader_sweep),
+    ('encoder_spin', encoder_spin),
+    ('layer_switch', layer_switch),
+    ('filter_reset', filter_reset),
+    ('track_creation', track_creation),
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(surface, c_instance, messages, messages_per_tick=MESSAGES_PER_TICK):
+    """
+    Sends every message through receive_midi, ticking update_display every
+    `messages_per_tick` messages. Returns a dict of measurements.
+    """
+    reset_api_calls()
+    rebuilds = c_instance.midi_map_rebuilds
+    sent = len(c_instance.sent_midi)
+    latencies = []
+    tick_time = 0.0
+    ticks = 0
+    for count, message in enumerate(messages, 1):
+        start = time.perf_counter()
+        surface.receive_midi(message)
+        latencies.append(time.perf_counter() - start)
+        if count % messages_per_tick == 0:
+            start = time.perf_counter()
+            surface.update_display()
+            tick_time += time.perf_counter() - start
+            ticks += 1
+    start = time.perf_counter()
+    surface.update_display()
+    tick_time += time.perf_counter() - start
+    ticks += 1
+
+    latencies.sort()
+    writes = sum(n for key, n in api_calls.items() if key.startswith('set '))
+    return {
+        'messages': len(latencies),
+        'mean_us': 1e6 * sum(latencies) / len(latencies) if latencies else 0.0,
+        'p50_us': 1e6 * percentile(latencies, 0.5),
+        'p99_us': 1e6 * percentile(latencies, 0.99),
+        'max_us': 1e6 * (latencies[-1] if latencies else 0.0),
+        'tick_us': 1e6 * tick_time / ticks,
+        'api_calls': sum(api_calls.values()),
+        'api_writes': writes,
+        'rebuilds': c_instance.midi_map_rebuilds - rebuilds,
+        'midi_out': len(c_instance.sent_midi) - sent,
+    }
+
+
+COLUMNS = [
+    ('scenario', '%-15s'), ('messages', '%9d'), ('mean_us', '%9.1f'), ('p50_us', '%9.1f'),
+    ('p99_us', '%9.1f'), ('max_us', '%10.1f'), ('tick_us', '%9.1f'), ('api_calls', '%10d'),
+    ('api_writes', '%10d'), ('rebuilds', '%8d'), ('midi_out', '%8d'),
+]
+
+
+def format_row(row):
+    return ' '.join(fmt % row[name] for name, fmt in COLUMNS)
+
+
+def format_header():
+    return ' '.join(('%' + fmt[1:].split('.')[0].rstrip('dfs') + 's') % name for name, fmt in COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=32, help='dynamic tracks in the song')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions of each scenario pattern')
+    parser.add_argument('--messages-per-tick', type=int, default=MESSAGES_PER_TICK)
+    parser.add_argument('--scenario', action='append', choices=[name for name, _ in SCENARIOS],
+                        help='run only these scenarios (default: all)')
+    parser.add_argument('--instrument', action='store_true',
+                        help='print per-handler latency histograms after the run')
+    parser.add_argument('--trace', metavar='DIRECTORY',
+                        help='record the generated traffic as a trace for replay.py')
+    args = parser.parse_args(argv)
+    if args.instrument:
+        # Must be set before the script is imported, see instrumentation.py
+        os.environ['XONEK2_INSTRUMENTATION'] = '1'
+
+    xone = harness.load_script()
+    selected = args.scenario or [name for name, _ in SCENARIOS]
+
+    start = time.perf_counter()
+    song = harness.build_song(num_tracks=args.tracks)
+    surface, c_instance = harness.create_surface(song)
+    print('startup: %.1fms, %d tracks' % (1e3 * (time.perf_counter() - start), len(song.tracks)))
+    if args.trace:
+        print('recording trace to %s' % surface.start_trace(args.trace))
+    print(format_header())
+    for name, scenario in SCENARIOS:
+        if name not in selected:
+            continue
+        row = run_scenario(surface, c_instance, scenario(xone, args.repeat), args.messages_per_tick)
+        row['scenario'] = name
+        print(format_row(row))
+    if args.instrument:
+        print()
+        print(harness.script_module('instrumentation').instrumentation.report())
+    surface.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,994 @@
+"""
+Minimal stand-in for the `_Framework`, `ableton`, `_Generic` and
+`MidiRemoteScript` modules, covering what XoneK2 uses. Behaviour follows the
+real framework closely enough to exercise the script's hot paths: elements
+dispatch incoming MIDI to value listeners and to mapped parameters,
+listener changes request MIDI map rebuilds, and tasks run on update_display
+ticks.
+
+`install()` registers everything in sys.modules; it must run before the
+script package is imported.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+import sys
+import types
+from contextlib import contextmanager
+from functools import partial
+
+import fake_live
+from fake_live import liveobj_valid
+
+ABSOLUTE_MAP_MODE = 0
+
+MIDI_NOTE_TYPE = 0
+MIDI_CC_TYPE = 1
+MIDI_PB_TYPE = 2
+MIDI_SYSEX_TYPE = 3
+
+NOTE_ON_STATUS = 0x90
+NOTE_OFF_STATUS = 0x80
+CC_STATUS = 0xB0
+
+_surfaces = []
+_dependencies = {}
+
+
+def _current_surface():
+    return _surfaces[-1] if _surfaces else None
+
+
+def nop(*a, **k):
+    pass
+
+
+# Dependency
+
+def depends(**defaults):
+    def decorator(fn):
+        def wrapper(*a, **k):
+            for name, default in defaults.items():
+                if name not in k:
+                    k[name] = _dependencies.get(name, default)
+            return fn(*a, **k)
+        wrapper.__name__ = fn.__name__
+        return wrapper
+    return decorator
+
+
+# SubjectSlot
+
+class SubjectSlot(object):
+
+    def __init__(self, event, callback):
+        self._event = event
+        self._callback = callback
+        self._subject = None
+
+    def _listen(self, subject, add):
+        method = getattr(subject, '%s_%s_listener' % ('add' if add else 'remove', self._event))
+        method(self._callback)
+
+    @property
+    def subject(self):
+        return self._subject
+
+    @subject.setter
+    def subject(self, subject):
+        if self._subject is subject:
+            return
+        if liveobj_valid(self._subject):
+            self._listen(self._subject, False)
+        self._subject = subject
+        if subject is not None:
+            self._listen(subject, True)
+
+    def __call__(self, *a, **k):
+        return self._callback(*a, **k)
+
+
+class SubjectSlotGroup(object):
+
+    def __init__(self, event, callback):
+        self._event = event
+        self._callback = callback
+        self._listeners = []
+
+    def replace_subjects(self, subjects):
+        for subject, listener in self._listeners:
+            if liveobj_valid(subject):
+                getattr(subject, 'remove_%s_listener' % self._event)(listener)
+        self._listeners = []
+        for subject in subjects:
+            listener = partial(self._callback, subject)
+            getattr(subject, 'add_%s_listener' % self._event)(listener)
+            self._listeners.append((subject, listener))
+
+    def __call__(self, *a, **k):
+        return self._callback(*a, **k)
+
+
+class _SlotDescriptor(object):
+
+    def __init__(self, slot_type, event, fn):
+        self._slot_type = slot_type
+        self._event = event
+        self._fn = fn
+        self._attr = None
+
+    def __set_name__(self, owner, name):
+        self._attr = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        slot = instance.__dict__.get(self._attr)
+        if slot is None:
+            slot = self._slot_type(self._event, partial(self._fn, instance))
+            instance.__dict__[self._attr] = slot
+        return slot
+
+
+def subject_slot(event):
+    return lambda fn: _SlotDescriptor(SubjectSlot, event, fn)
+
+
+def subject_slot_group(event):
+    return lambda fn: _SlotDescriptor(SubjectSlotGroup, event, fn)
+
+
+# Task
+
+class Task(object):
+
+    def __init__(self, fn):
+        self._fn = fn
+        self._killed = False
+
+    @property
+    def is_killed(self):
+        return self._killed
+
+    def kill(self):
+        self._killed = True
+
+    def restart(self):
+        self._killed = False
+
+    def update(self):
+        if not self._killed:
+            self._killed = True
+            self._fn()
+
+
+class TaskGroup(object):
+
+    def __init__(self):
+        self._tasks = []
+
+    def add(self, task):
+        self._tasks.append(task)
+        return task
+
+    def update(self):
+        for task in list(self._tasks):
+            task.update()
+
+
+def _task_run(fn):
+    return Task(fn)
+
+
+# Elements
+
+class InputControlElement(object):
+
+    def __init__(self, msg_type, channel, identifier, *a, **k):
+        self._msg_type = msg_type
+        self._channel = channel
+        self._identifier = identifier
+        self._value_listeners = []
+        self._parameter = None
+        self._last_sent_value = None
+        self.name = ''
+        self._surface = _current_surface()
+        if self._surface is not None:
+            self._surface._register_element(self)
+
+    def message_type(self):
+        return self._msg_type
+
+    def message_channel(self):
+        return self._channel
+
+    def message_identifier(self):
+        return self._identifier
+
+    def _request_rebuild(self):
+        if self._surface is not None:
+            self._surface.request_rebuild_midi_map()
+
+    def add_value_listener(self, callback, identify_sender=False):
+        if callback not in self._value_listeners:
+            self._value_listeners.append(callback)
+            self._request_rebuild()
+
+    def remove_value_listener(self, callback):
+        if callback in self._value_listeners:
+            self._value_listeners.remove(callback)
+            self._request_rebuild()
+
+    def value_has_listener(self, callback):
+        return callback in self._value_listeners
+
+    def connect_to(self, parameter):
+        if self._parameter is not parameter:
+            self._parameter = parameter
+            self._request_rebuild()
+
+    def release_parameter(self):
+        if self._parameter is not None:
+            self._parameter = None
+            self._request_rebuild()
+
+    def mapped_parameter(self):
+        return self._parameter
+
+    def _map_value(self, value):
+        parameter = self._parameter
+        parameter.value = parameter.min + (parameter.max - parameter.min) * value / 127.0
+
+    def receive_value(self, value):
+        if self._parameter is not None and liveobj_valid(self._parameter):
+            # Live applies mapped parameters itself
+            self._map_value(value)
+        for callback in list(self._value_listeners):
+            callback(value)
+
+    def _status_byte(self):
+        base = NOTE_ON_STATUS if self._msg_type == MIDI_NOTE_TYPE else CC_STATUS
+        return base | self._channel
+
+    def send_value(self, value, force=False):
+        value = int(value)
+        if force or value != self._last_sent_value:
+            self._last_sent_value = value
+            self.send_midi((self._status_byte(), self._identifier, value))
+
+    def send_midi(self, message):
+        if self._surface is not None:
+            self._surface._send_midi(message)
+        return True
+
+    def clear_send_cache(self):
+        self._last_sent_value = None
+
+
+class ButtonElement(InputControlElement):
+
+    def __init__(self, is_momentary, msg_type, channel, identifier, *a, **k):
+        super(ButtonElement, self).__init__(msg_type, channel, identifier, *a, **k)
+        self._is_momentary = is_momentary
+        self._is_pressed = False
+
+    def is_momentary(self):
+        return self._is_momentary
+
+    def is_pressed(self):
+        return self._is_pressed
+
+    def receive_value(self, value):
+        self._is_pressed = value != 0
+        super(ButtonElement, self).receive_value(value)
+
+    def turn_on(self):
+        self.send_value(127)
+
+    def turn_off(self):
+        self.send_value(0)
+
+    def set_light(self, value):
+        self.send_value(127 if value else 0)
+
+
+class EncoderElement(InputControlElement):
+
+    def __init__(self, msg_type, channel, identifier, map_mode, encoder_sensitivity=1.0, *a, **k):
+        super(EncoderElement, self).__init__(msg_type, channel, identifier, *a, **k)
+        self._map_mode = map_mode
+        self.encoder_sensitivity = encoder_sensitivity
+        self.mapping_sensitivity = 1.0
+
+    def _map_value(self, value):
+        if self._map_mode == ABSOLUTE_MAP_MODE:
+            super(EncoderElement, self)._map_value(value)
+            return
+        parameter = self._parameter
+        delta = value if value < 64 else value - 128
+        step = (parameter.max - parameter.min) / 127.0 * self.mapping_sensitivity
+        parameter.value = max(parameter.min, min(parameter.max, parameter.value + delta * step))
+
+
+class SliderElement(EncoderElement):
+
+    def __init__(self, msg_type, channel, identifier, *a, **k):
+        super(SliderElement, self).__init__(msg_type, channel, identifier, ABSOLUTE_MAP_MODE, *a, **k)
+
+
+class ButtonMatrixElement(object):
+
+    def __init__(self, rows=[], *a, **k):
+        self._rows = [list(row) for row in rows]
+
+    def width(self):
+        return max(len(row) for row in self._rows) if self._rows else 0
+
+    def height(self):
+        return len(self._rows)
+
+    def iterbuttons(self):
+        for y, row in enumerate(self._rows):
+            for x, button in enumerate(row):
+                yield button, (x, y)
+
+
+# Controls (the `_Framework.Control` API used by MixerComponent)
+
+class _ControlListState(object):
+
+    def __init__(self, manager, control):
+        self._manager = manager
+        self._control = control
+        self._input_elements = []
+        self._listeners = []
+
+    def set_control_element(self, elements):
+        for element, listener in self._listeners:
+            element.remove_value_listener(listener)
+        self._listeners = []
+        self._input_elements = list(elements or [])
+        for element in self._input_elements:
+            if element is not None:
+                listener = partial(self._on_value, element)
+                element.add_value_listener(listener)
+                self._listeners.append((element, listener))
+
+    def _on_value(self, element, value):
+        handler = self._control._pressed if value else self._control._released
+        if handler is not None:
+            handler(self._manager, element)
+
+
+class ControlList(object):
+
+    def __init__(self, control_type, *a, **k):
+        self._pressed = None
+        self._released = None
+        self._attr = None
+
+    def __set_name__(self, owner, name):
+        if self._attr is None:
+            self._attr = name
+
+    def pressed(self, fn):
+        self._pressed = fn
+        return self
+
+    def released(self, fn):
+        self._released = fn
+        return self
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        key = '_control_state_' + self._attr
+        state = instance.__dict__.get(key)
+        if state is None:
+            state = _ControlListState(instance, self)
+            instance.__dict__[key] = state
+        return state
+
+
+class ButtonControl(object):
+    pass
+
+
+class EncoderControl(object):
+
+    def __get__(self, instance, owner):
+        return self
+
+
+def control_list(control_type, *a, **k):
+    return ControlList(control_type, *a, **k)
+
+
+# Components
+
+class ControlSurfaceComponent(object):
+
+    def __init__(self, *a, **k):
+        self._is_enabled = True
+        self._surface = _current_surface()
+        self.name = ''
+        if self._surface is not None:
+            self._surface._register_component(self)
+
+    def song(self):
+        return self._surface.song()
+
+    def application(self):
+        return None
+
+    @property
+    def canonical_parent(self):
+        return self._surface
+
+    @property
+    def _tasks(self):
+        return self._surface._task_group
+
+    def is_enabled(self):
+        return self._is_enabled
+
+    def set_enabled(self, enable):
+        if self._is_enabled != bool(enable):
+            self._is_enabled = bool(enable)
+            self.on_enabled_changed()
+
+    def on_enabled_changed(self):
+        self.update()
+
+    def update(self):
+        pass
+
+    def on_track_list_changed(self):
+        pass
+
+    def on_selected_track_changed(self):
+        pass
+
+    def on_selected_scene_changed(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+class CompoundComponent(ControlSurfaceComponent):
+
+    def __init__(self, *a, **k):
+        super(CompoundComponent, self).__init__(*a, **k)
+        self._sub_components = []
+
+    def register_components(self, *components):
+        self._sub_components.extend(components)
+
+    def register_component(self, component):
+        self._sub_components.append(component)
+        return component
+
+
+def _bind_button(owner, attr, button, callback):
+    old = getattr(owner, attr, None)
+    if old is button:
+        return
+    if old is not None:
+        old.remove_value_listener(callback)
+    setattr(owner, attr, button)
+    if button is not None:
+        button.add_value_listener(callback)
+
+
+class ChannelStripComponentBase(ControlSurfaceComponent):
+
+    def __init__(self, *a, **k):
+        super(ChannelStripComponentBase, self).__init__(*a, **k)
+        self._track = None
+        self._volume_control = None
+        self._send_controls = []
+        self._solo_button = None
+        self._mute_button = None
+        self._arm_button = None
+
+    def set_track(self, track):
+        self._track = track
+        self._connect_parameters()
+
+    def _connect_parameters(self):
+        track = self._track
+        if self._volume_control is not None:
+            if track is not None:
+                self._volume_control.connect_to(track.mixer_device.volume)
+            else:
+                self._volume_control.release_parameter()
+        sends = track.mixer_device.sends if track is not None else []
+        for index, control in enumerate(self._send_controls):
+            if control is None:
+                continue
+            if index < len(sends):
+                control.connect_to(sends[index])
+            else:
+                control.release_parameter()
+
+    def set_volume_control(self, control):
+        if self._volume_control is not None:
+            self._volume_control.release_parameter()
+        self._volume_control = control
+        self._connect_parameters()
+
+    def set_send_controls(self, controls):
+        for control in self._send_controls:
+            if control is not None:
+                control.release_parameter()
+        self._send_controls = list(controls or [])
+        self._connect_parameters()
+
+    def _toggle(self, prop, value):
+        if value and liveobj_valid(self._track):
+            setattr(self._track, prop, not getattr(self._track, prop))
+
+    def set_solo_button(self, button):
+        _bind_button(self, '_solo_button', button, self._on_solo)
+
+    def set_mute_button(self, button):
+        _bind_button(self, '_mute_button', button, self._on_mute)
+
+    def set_arm_button(self, button):
+        _bind_button(self, '_arm_button', button, self._on_arm)
+
+    def _on_solo(self, value):
+        self._toggle('solo', value)
+
+    def _on_mute(self, value):
+        self._toggle('mute', value)
+
+    def _on_arm(self, value):
+        if liveobj_valid(self._track) and self._track.can_be_armed:
+            self._toggle('arm', value)
+
+
+class MixerComponentBase(CompoundComponent):
+
+    def __init__(self, num_tracks, num_returns=0, *a, **k):
+        super(MixerComponentBase, self).__init__(*a, **k)
+        self._track_offset = -1
+        self._channel_strips = []
+        for _ in range(num_tracks):
+            strip = self._create_strip()
+            self._channel_strips.append(strip)
+            self.register_components(strip)
+        self.set_track_offset(0)
+
+    def _create_strip(self):
+        return ChannelStripComponentBase()
+
+    def channel_strip(self, index):
+        return self._channel_strips[index]
+
+    def tracks_to_use(self):
+        return self.song().visible_tracks
+
+    def set_track_offset(self, offset):
+        if offset != self._track_offset:
+            self._track_offset = offset
+            self._reassign_tracks()
+
+    def on_track_list_changed(self):
+        self._reassign_tracks()
+
+    def _reassign_tracks(self):
+        tracks = self.tracks_to_use()
+        for index, strip in enumerate(self._channel_strips):
+            track_index = self._track_offset + index
+            strip.set_track(tracks[track_index] if len(tracks) > track_index else None)
+
+    def set_volume_controls(self, controls):
+        for strip, control in zip(self._channel_strips, controls):
+            strip.set_volume_control(control)
+
+    def set_solo_buttons(self, buttons):
+        for strip, button in zip(self._channel_strips, buttons):
+            strip.set_solo_button(button)
+
+    def set_mute_buttons(self, buttons):
+        for strip, button in zip(self._channel_strips, buttons):
+            strip.set_mute_button(button)
+
+    def set_arm_buttons(self, buttons):
+        for strip, button in zip(self._channel_strips, buttons):
+            strip.set_arm_button(button)
+
+
+class ClipSlotComponent(ControlSurfaceComponent):
+
+    def __init__(self, *a, **k):
+        super(ClipSlotComponent, self).__init__(*a, **k)
+        self._clip_slot = None
+        self._launch_button = None
+        self._started_value = 127
+        self._stopped_value = 0
+        self._triggered_to_play_value = 127
+        self._recording_value = 127
+
+    def clip_slot(self):
+        return self._clip_slot
+
+    def set_clip_slot(self, clip_slot):
+        if clip_slot is self._clip_slot:
+            return
+        if liveobj_valid(self._clip_slot):
+            self._clip_slot.remove_playing_status_listener(self.update)
+        self._clip_slot = clip_slot
+        if clip_slot is not None:
+            clip_slot.add_playing_status_listener(self.update)
+        self.update()
+
+    def set_launch_button(self, button):
+        _bind_button(self, '_launch_button', button, self._on_launch)
+        self.update()
+
+    def set_started_value(self, value):
+        self._started_value = value
+
+    def set_stopped_value(self, value):
+        self._stopped_value = value
+
+    def set_triggered_to_play_value(self, value):
+        self._triggered_to_play_value = value
+
+    def set_recording_value(self, value):
+        self._recording_value = value
+
+    def _on_launch(self, value):
+        if value and liveobj_valid(self._clip_slot):
+            self._clip_slot.fire()
+
+    def update(self):
+        button = self._launch_button
+        if button is None:
+            return
+        slot = self._clip_slot
+        value = self._stopped_value
+        if liveobj_valid(slot):
+            if slot.is_recording:
+                value = self._recording_value
+            elif slot.is_triggered:
+                value = self._triggered_to_play_value
+            elif slot.is_playing:
+                value = self._started_value
+        button.send_value(value)
+
+
+class SceneComponentBase(CompoundComponent):
+    clip_slot_component_type = ClipSlotComponent
+
+    def __init__(self, num_slots=0, tracks_to_use_callback=None, *a, **k):
+        super(SceneComponentBase, self).__init__(*a, **k)
+        self._scene = None
+        self._track_offset = 0
+        self._allow_updates = True
+        self._update_requests = 0
+        self._tracks_to_use_callback = tracks_to_use_callback
+        self._clip_slots = [self.clip_slot_component_type() for _ in range(num_slots)]
+        self.register_components(*self._clip_slots)
+
+    def clip_slot(self, index):
+        return self._clip_slots[index]
+
+    def set_scene(self, scene):
+        self._scene = scene
+        self.update()
+
+    def set_track_offset(self, offset):
+        if offset != self._track_offset:
+            self._track_offset = offset
+            self.update()
+
+    def _update_launch_button(self):
+        pass
+
+    def update(self):
+        pass
+
+
+class SessionComponentBase(CompoundComponent):
+    scene_component_type = SceneComponentBase
+
+    def __init__(self, num_tracks=0, num_scenes=0, *a, **k):
+        super(SessionComponentBase, self).__init__(*a, **k)
+        self._num_tracks = num_tracks
+        self._track_offset = 0
+        self._scene_offset = 0
+        self._mixer = None
+        self._stop_all_button = None
+        self._stop_track_buttons = []
+        self._scenes = [self._create_scene() for _ in range(num_scenes)]
+        self.register_components(*self._scenes)
+        self._reassign_scenes()
+
+    def _create_scene(self):
+        return self.scene_component_type(num_slots=self._num_tracks, tracks_to_use_callback=self.tracks_to_use)
+
+    def scene(self, index):
+        return self._scenes[index]
+
+    def tracks_to_use(self):
+        return self.song().visible_tracks
+
+    def track_offset(self):
+        return self._track_offset
+
+    def scene_offset(self):
+        return self._scene_offset
+
+    def width(self):
+        return self._num_tracks
+
+    def height(self):
+        return len(self._scenes)
+
+    def set_mixer(self, mixer):
+        self._mixer = mixer
+        if mixer is not None:
+            mixer.set_track_offset(self._track_offset)
+
+    def set_offsets(self, track_offset, scene_offset):
+        self._track_offset = max(0, track_offset)
+        self._scene_offset = max(0, scene_offset)
+        if self._mixer is not None:
+            self._mixer.set_track_offset(self._track_offset)
+        self._reassign_scenes()
+
+    def _reassign_scenes(self):
+        scenes = self.song().scenes
+        for index, scene in enumerate(self._scenes):
+            scene_index = self._scene_offset + index
+            scene._track_offset = self._track_offset
+            scene.set_scene(scenes[scene_index] if len(scenes) > scene_index else None)
+
+    def on_track_list_changed(self):
+        self._reassign_scenes()
+
+    def set_stop_all_clips_button(self, button):
+        _bind_button(self, '_stop_all_button', button, self._on_stop_all)
+
+    def _on_stop_all(self, value):
+        if value:
+            self.song().stop_all_clips()
+
+    def set_stop_track_clip_buttons(self, buttons):
+        for button, listener in self._stop_track_buttons:
+            button.remove_value_listener(listener)
+        self._stop_track_buttons = []
+        for index, button in enumerate(buttons or []):
+            listener = partial(self._on_stop_track, index)
+            button.add_value_listener(listener)
+            self._stop_track_buttons.append((button, listener))
+
+    def _on_stop_track(self, index, value):
+        tracks = self.tracks_to_use()
+        track_index = self._track_offset + index
+        if value and track_index < len(tracks):
+            tracks[track_index].stop_all_clips()
+
+    def update(self):
+        for scene in self._scenes:
+            scene.update()
+
+
+class TransportComponent(ControlSurfaceComponent):
+
+    def __init__(self, *a, **k):
+        super(TransportComponent, self).__init__(*a, **k)
+
+    def set_play_button(self, button):
+        _bind_button(self, '_play_button', button, self._on_play)
+
+    def set_stop_button(self, button):
+        _bind_button(self, '_stop_button', button, self._on_stop)
+
+    def set_record_button(self, button):
+        _bind_button(self, '_record_button', button, self._on_record)
+
+    def set_metronome_button(self, button):
+        _bind_button(self, '_metronome_button', button, self._on_metronome)
+
+    def _on_play(self, value):
+        if value:
+            self.song().start_playing()
+
+    def _on_stop(self, value):
+        if value:
+            self.song().stop_playing()
+
+    def _on_record(self, value):
+        if value:
+            self.song().record_mode = not self.song().record_mode
+
+    def _on_metronome(self, value):
+        if value:
+            self.song().metronome = not self.song().metronome
+
+
+class SessionRecordingComponent(ControlSurfaceComponent):
+    pass
+
+
+class ClipCreator(object):
+    pass
+
+
+class ControlSurface(object):
+
+    def __init__(self, c_instance=None, *a, **k):
+        self._c_instance = c_instance
+        self._components = []
+        self._input_elements = {}
+        self._task_group = TaskGroup()
+        self._suppress_requests_counter = 0
+        self._rebuild_requests_during_suppression = 0
+        self._scheduled = []
+        self.song().add_visible_tracks_listener(self._on_track_list_changed)
+
+    def song(self):
+        return self._c_instance.song()
+
+    def application(self):
+        return None
+
+    @contextmanager
+    def component_guard(self):
+        _surfaces.append(self)
+        previous = _dependencies.get('show_message')
+        _dependencies['show_message'] = self.show_message
+        self._set_suppress_rebuild_requests(True)
+        try:
+            yield
+        finally:
+            self._set_suppress_rebuild_requests(False)
+            _dependencies['show_message'] = previous
+            _surfaces.pop()
+
+    def _set_suppress_rebuild_requests(self, suppress_requests):
+        if suppress_requests:
+            self._suppress_requests_counter += 1
+        else:
+            self._suppress_requests_counter -= 1
+            if self._suppress_requests_counter == 0 and self._rebuild_requests_during_suppression > 0:
+                self._rebuild_requests_during_suppression = 0
+                self.request_rebuild_midi_map()
+
+    def request_rebuild_midi_map(self):
+        if self._suppress_requests_counter > 0:
+            self._rebuild_requests_during_suppression += 1
+        else:
+            self._c_instance.rebuild_midi_map()
+
+    def _register_component(self, component):
+        self._components.append(component)
+
+    def _register_element(self, element):
+        key = (element.message_type(), element.message_channel(), element.message_identifier())
+        self._input_elements.setdefault(key, []).append(element)
+
+    def _on_track_list_changed(self):
+        with self.component_guard():
+            for component in list(self._components):
+                component.on_track_list_changed()
+
+    def receive_midi(self, midi_bytes):
+        status, identifier, value = midi_bytes
+        kind = status & 0xF0
+        channel = status & 0x0F
+        if kind in (NOTE_ON_STATUS, NOTE_OFF_STATUS):
+            msg_type = MIDI_NOTE_TYPE
+            if kind == NOTE_OFF_STATUS:
+                value = 0
+        elif kind == CC_STATUS:
+            msg_type = MIDI_CC_TYPE
+        else:
+            return
+        with self.component_guard():
+            for element in self._input_elements.get((msg_type, channel, identifier), ()):
+                element.receive_value(value)
+
+    def _send_midi(self, midi_bytes, optimized=True):
+        self._c_instance.send_midi(midi_bytes)
+        return True
+
+    def schedule_message(self, delay_in_ticks, callback, parameter=None):
+        self._scheduled.append([delay_in_ticks, callback, parameter])
+
+    def update_display(self):
+        with self.component_guard():
+            self._task_group.update()
+            scheduled, self._scheduled = self._scheduled, []
+            for entry in scheduled:
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    entry[1]() if entry[2] is None else entry[1](entry[2])
+                else:
+                    self._scheduled.append(entry)
+
+    def refresh_state(self):
+        for elements in self._input_elements.values():
+            for element in elements:
+                element.clear_send_cache()
+
+    def build_midi_map(self, midi_map_handle):
+        pass
+
+    def log_message(self, *message):
+        self._c_instance.log_message(' '.join(map(str, message)))
+
+    def show_message(self, message):
+        self._c_instance.show_message(message)
+
+    def disconnect(self):
+        for component in self._components:
+            component.disconnect()
+        self.song().remove_visible_tracks_listener(self._on_track_list_changed)
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    """
+    Registers the fake Live, _Framework, ableton, _Generic and
+    MidiRemoteScript modules. Safe to call more than once.
+    """
+    if '_Framework' in sys.modules and getattr(sys.modules['_Framework'], 'is_fake', False):
+        return
+    sys.modules['Live'] = fake_live.make_module()
+    _module('MidiRemoteScript')
+
+    framework = _module('_Framework', is_fake=True)
+    task_module = _module('_Framework.Task', Task=Task, TaskGroup=TaskGroup, run=_task_run)
+    framework.Task = task_module
+    element_names = dict(
+        MIDI_NOTE_TYPE=MIDI_NOTE_TYPE, MIDI_CC_TYPE=MIDI_CC_TYPE,
+        MIDI_PB_TYPE=MIDI_PB_TYPE, MIDI_SYSEX_TYPE=MIDI_SYSEX_TYPE,
+        InputControlElement=InputControlElement)
+    submodules = {
+        'ButtonElement': dict(ButtonElement=ButtonElement),
+        'ButtonMatrixElement': dict(ButtonMatrixElement=ButtonMatrixElement),
+        'ControlSurface': dict(ControlSurface=ControlSurface),
+        'ClipCreator': dict(ClipCreator=ClipCreator),
+        'EncoderElement': dict(EncoderElement=EncoderElement),
+        'InputControlElement': element_names,
+        'SessionRecordingComponent': dict(SessionRecordingComponent=SessionRecordingComponent),
+        'SliderElement': dict(SliderElement=SliderElement),
+        'TransportComponent': dict(TransportComponent=TransportComponent),
+        'MixerComponent': dict(MixerComponent=MixerComponentBase),
+        'ChannelStripComponent': dict(ChannelStripComponent=ChannelStripComponentBase),
+        'SceneComponent': dict(SceneComponent=SceneComponentBase),
+        'SessionComponent': dict(SessionComponent=SessionComponentBase),
+        'ClipSlotComponent': dict(ClipSlotComponent=ClipSlotComponent),
+        'ControlSurfaceComponent': dict(ControlSurfaceComponent=ControlSurfaceComponent),
+        'CompoundComponent': dict(CompoundComponent=CompoundComponent),
+        'SubjectSlot': dict(subject_slot=subject_slot, subject_slot_group=subject_slot_group),
+        'Dependency': dict(depends=depends),
+        'Util': dict(nop=nop),
+        'Control': dict(ButtonControl=ButtonControl, EncoderControl=EncoderControl, control_list=control_list),
+    }
+    for name, attrs in submodules.items():
+        setattr(framework, name, _module('_Framework.' + name, **attrs))
+
+    ableton = _module('ableton')
+    ableton.v2 = _module('ableton.v2')
+    ableton.v2.base = _module('ableton.v2.base', liveobj_valid=liveobj_valid)
+    ableton.v3 = _module('ableton.v3')
+    ableton.v3.live = _module('ableton.v3.live', liveobj_valid=liveobj_valid)
+
+    def get_parameter_by_name(device, name):
+        for parameter in device.parameters:
+            if parameter.name == name:
+                return parameter
+
+    generic = _module('_Generic')
+    generic.Devices = _module('_Generic.Devices', get_parameter_by_name=get_parameter_by_name)
@@ -0,0 +1,434 @@
+"""
+Stand-in for the parts of Live's Python object model the script touches:
+song, tracks, devices, parameters, scenes and clip slots.
+
+Every property read/write and method call on a fake Live object is counted
+in `api_calls`, which is what the benchmarks report as "Live API calls".
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+import itertools
+import types
+from collections import Counter
+
+api_calls = Counter()
+
+_next_ptr = itertools.count(0x1000)
+
+
+def reset_api_calls():
+    api_calls.clear()
+
+
+def liveobj_valid(obj):
+    return obj is not None and not getattr(obj, '_deleted', False)
+
+
+class LiveObject(object):
+    """
+    Base for fake Live objects. Supports Live's add_<prop>_listener /
+    remove_<prop>_listener / <prop>_has_listener convention for any property.
+    """
+
+    def __init__(self):
+        self._live_ptr = next(_next_ptr)
+        self._listeners = {}
+        self._deleted = False
+
+    def __getattr__(self, name):
+        if name.startswith('add_') and name.endswith('_listener'):
+            return self._listener_method(name[4:-9], self._add_listener)
+        if name.startswith('remove_') and name.endswith('_listener'):
+            return self._listener_method(name[7:-9], self._remove_listener)
+        if name.endswith('_has_listener'):
+            return self._listener_method(name[:-13], self._has_listener)
+        raise AttributeError(name)
+
+    def _listener_method(self, prop, method):
+        def listener_method(callback):
+            api_calls['%s.%s_listener' % (type(self).__name__, prop)] += 1
+            return method(prop, callback)
+        return listener_method
+
+    def _add_listener(self, prop, callback):
+        self._listeners.setdefault(prop, []).append(callback)
+
+    def _remove_listener(self, prop, callback):
+        listeners = self._listeners.get(prop, [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    def _has_listener(self, prop, callback):
+        return callback in self._listeners.get(prop, [])
+
+    def listener_count(self, prop=None):
+        if prop is not None:
+            return len(self._listeners.get(prop, []))
+        return sum(len(l) for l in self._listeners.values())
+
+    def notify(self, prop):
+        for callback in list(self._listeners.get(prop, [])):
+            callback()
+
+
+def live_property(name, notify=True, read_only=False):
+    attr = '_' + name
+
+    def getter(self):
+        api_calls['get %s.%s' % (type(self).__name__, name)] += 1
+        return getattr(self, attr)
+
+    def setter(self, value):
+        api_calls['set %s.%s' % (type(self).__name__, name)] += 1
+        if getattr(self, attr) != value:
+            setattr(self, attr, value)
+            if notify:
+                self.notify(name)
+
+    return property(getter, None if read_only else setter)
+
+
+def live_method(fn):
+    def method(self, *a, **k):
+        api_calls['call %s.%s' % (type(self).__name__, fn.__name__)] += 1
+        return fn(self, *a, **k)
+    method.__name__ = fn.__name__
+    return method
+
+
+class DeviceParameter(LiveObject):
+    value = live_property('value')
+    name = live_property('name')
+    min = live_property('min', read_only=True)
+    max = live_property('max', read_only=True)
+    default_value = live_property('default_value', read_only=True)
+    is_quantized = live_property('is_quantized', read_only=True)
+    state = live_property('state', read_only=True)
+
+    def __init__(self, name, value=0.0, min=0.0, max=1.0, default_value=None, is_quantized=False):
+        super(DeviceParameter, self).__init__()
+        self._name = name
+        self._min = min
+        self._max = max
+        self._default_value = value if default_value is None else default_value
+        self._value = value
+        self._is_quantized = is_quantized
+        self._state = 0
+
+
+class Device(LiveObject):
+    name = live_property('name')
+    parameters = live_property('parameters', read_only=True)
+
+    def __init__(self, name, parameters=()):
+        super(Device, self).__init__()
+        self._name = name
+        self._parameters = tuple([DeviceParameter('Device On', 1.0, is_quantized=True)] + list(parameters))
+
+
+class MixerDevice(LiveObject):
+    volume = live_property('volume', read_only=True)
+    panning = live_property('panning', read_only=True)
+    sends = live_property('sends', read_only=True)
+
+    def __init__(self, num_sends=2):
+        super(MixerDevice, self).__init__()
+        self._volume = DeviceParameter('Track Volume', 0.85 * 0.8, default_value=0.85)
+        self._panning = DeviceParameter('Track Panning', 0.0, min=-1.0, max=1.0)
+        self._sends = tuple(DeviceParameter('Send %s' % chr(ord('A') + i), 0.0) for i in range(num_sends))
+
+
+class Clip(LiveObject):
+    name = live_property('name')
+    is_playing = live_property('is_playing')
+    is_triggered = live_property('is_triggered')
+    is_recording = live_property('is_recording')
+
+    def __init__(self, name=''):
+        super(Clip, self).__init__()
+        self._name = name
+        self._is_playing = False
+        self._is_triggered = False
+        self._is_recording = False
+
+
+class ClipSlot(LiveObject):
+    clip = live_property('clip', read_only=True)
+    has_clip = live_property('has_clip', read_only=True)
+    is_playing = live_property('is_playing', read_only=True)
+    is_triggered = live_property('is_triggered', read_only=True)
+    is_recording = live_property('is_recording', read_only=True)
+    playing_status = live_property('playing_status', read_only=True)
+    has_stop_button = live_property('has_stop_button', read_only=True)
+    controls_other_clips = live_property('controls_other_clips', read_only=True)
+    color = live_property('color', read_only=True)
+
+    def __init__(self, clip=None):
+        super(ClipSlot, self).__init__()
+        self._clip = clip
+        self._has_clip = clip is not None
+        self._is_playing = False
+        self._is_triggered = False
+        self._is_recording = False
+        self._playing_status = 0
+        self._has_stop_button = True
+        self._controls_other_clips = False
+        self._color = 0
+
+    def _set_state(self, playing=False, triggered=False, recording=False):
+        self._is_playing = playing
+        self._is_triggered = triggered
+        self._is_recording = recording
+        self._playing_status = 1 if playing else (2 if triggered else 0)
+        self.notify('playing_status')
+        self.notify('is_triggered')
+
+    @live_method
+    def fire(self, *a, **k):
+        self._set_state(triggered=True)
+
+    @live_method
+    def stop(self):
+        self._set_state()
+
+    @live_method
+    def set_fire_button_state(self, state):
+        pass
+
+
+class RoutingType(object):
+
+    def __init__(self, display_name):
+        self.display_name = display_name
+
+
+class Track(LiveObject):
+    name = live_property('name')
+    arm = live_property('arm')
+    solo = live_property('solo')
+    mute = live_property('mute')
+    fold_state = live_property('fold_state')
+    input_routing_type = live_property('input_routing_type')
+    devices = live_property('devices', read_only=True)
+    mixer_device = live_property('mixer_device', read_only=True)
+    clip_slots = live_property('clip_slots', read_only=True)
+    can_be_armed = live_property('can_be_armed', read_only=True)
+    is_visible = live_property('is_visible', read_only=True)
+    is_foldable = live_property('is_foldable', read_only=True)
+    available_input_routing_types = live_property('available_input_routing_types', read_only=True)
+    has_audio_input = live_property('has_audio_input', read_only=True)
+    has_midi_input = live_property('has_midi_input', read_only=True)
+    is_frozen = live_property('is_frozen', read_only=True)
+    color = live_property('color', read_only=True)
+
+    def __init__(self, name, num_scenes=1, devices=(), num_sends=2, can_be_armed=True):
+        super(Track, self).__init__()
+        self._name = name
+        self._arm = False
+        self._solo = False
+        self._mute = False
+        self._fold_state = False
+        self._devices = list(devices)
+        self._mixer_device = MixerDevice(num_sends)
+        self._clip_slots = [ClipSlot() for _ in range(num_scenes)]
+        self._can_be_armed = can_be_armed
+        self._is_visible = True
+        self._is_foldable = False
+        self._available_input_routing_types = tuple(
+            RoutingType(n) for n in ('Ext. In', 'Resampling', 'Instruments', 'No Input'))
+        self._input_routing_type = self._available_input_routing_types[0]
+        self._has_audio_input = True
+        self._has_midi_input = False
+        self._is_frozen = False
+        self._color = 0
+
+    @live_method
+    def stop_all_clips(self, *a):
+        for slot in self._clip_slots:
+            slot._set_state()
+
+    def insert_device(self, device):
+        self._devices.append(device)
+        self.notify('devices')
+
+    def delete_device(self, index):
+        device = self._devices.pop(index)
+        device._deleted = True
+        self.notify('devices')
+
+
+class Scene(LiveObject):
+    name = live_property('name')
+    clip_slots = live_property('clip_slots', read_only=True)
+
+    def __init__(self, song, index):
+        super(Scene, self).__init__()
+        self._name = ''
+        self._song = song
+        self._index = index
+
+    @property
+    def _clip_slots(self):
+        return tuple(track._clip_slots[self._index] for track in self._song._tracks)
+
+    @live_method
+    def fire(self, *a, **k):
+        for slot in self._clip_slots:
+            slot.fire()
+
+
+class SongView(LiveObject):
+    selected_track = live_property('selected_track')
+    selected_scene = live_property('selected_scene')
+
+    def __init__(self):
+        super(SongView, self).__init__()
+        self._selected_track = None
+        self._selected_scene = None
+
+
+class Song(LiveObject):
+    tracks = live_property('tracks', read_only=True)
+    visible_tracks = live_property('visible_tracks', read_only=True)
+    return_tracks = live_property('return_tracks', read_only=True)
+    master_track = live_property('master_track', read_only=True)
+    scenes = live_property('scenes', read_only=True)
+    view = live_property('view', read_only=True)
+    is_playing = live_property('is_playing')
+    record_mode = live_property('record_mode')
+    metronome = live_property('metronome')
+    tempo = live_property('tempo')
+    session_record = live_property('session_record')
+    overdub = live_property('overdub')
+    nudge_down = live_property('nudge_down')
+    nudge_up = live_property('nudge_up')
+    loop = live_property('loop')
+    punch_in = live_property('punch_in')
+    punch_out = live_property('punch_out')
+    current_song_time = live_property('current_song_time')
+
+    def __init__(self, num_scenes=1, num_sends=2):
+        super(Song, self).__init__()
+        self._num_scenes = num_scenes
+        self._num_sends = num_sends
+        self._tracks = []
+        self._return_tracks = tuple(Track('%s-Return' % chr(ord('A') + i), num_scenes, can_be_armed=False)
+                                    for i in range(num_sends))
+        self._master_track = Track('Main', num_scenes, can_be_armed=False)
+        self._scenes = tuple(Scene(self, i) for i in range(num_scenes))
+        self._view = SongView()
+        self._is_playing = False
+        self._record_mode = False
+        self._metronome = False
+        self._tempo = 120.0
+        self._session_record = False
+        self._overdub = False
+        self._nudge_down = False
+        self._nudge_up = False
+        self._loop = False
+        self._punch_in = False
+        self._punch_out = False
+        self._current_song_time = 0.0
+
+    @property
+    def _visible_tracks(self):
+        return tuple(track for track in self._tracks if track._is_visible)
+
+    def add_track(self, track):
+        self._tracks.append(track)
+        self.notify('tracks')
+        self.notify('visible_tracks')
+        return track
+
+    @live_method
+    def create_audio_track(self, index=-1):
+        track = Track('%d-Audio' % (len(self._tracks) + 1), self._num_scenes, num_sends=self._num_sends)
+        if index < 0:
+            self._tracks.append(track)
+        else:
+            self._tracks.insert(index, track)
+        self.notify('tracks')
+        self.notify('visible_tracks')
+        return track
+
+    @live_method
+    def delete_track(self, index):
+        track = self._tracks.pop(index)
+        track._deleted = True
+        self.notify('tracks')
+        self.notify('visible_tracks')
+
+    @live_method
+    def stop_all_clips(self, *a):
+        for track in self._tracks:
+            track.stop_all_clips()
+
+    @live_method
+    def start_playing(self):
+        self.is_playing = True
+
+    @live_method
+    def stop_playing(self):
+        self.is_playing = False
+
+    @live_method
+    def continue_playing(self):
+        self.is_playing = True
+
+
+class CInstance(object):
+    """
+    The c_instance handed to create_instance. Collects outgoing MIDI, log
+    lines, status bar messages and MIDI map rebuilds.
+    """
+
+    def __init__(self, song, echo_log=False):
+        self._song = song
+        self.echo_log = echo_log
+        self.sent_midi = []
+        self.log_lines = []
+        self.messages = []
+        self.midi_map_rebuilds = 0
+
+    def song(self):
+        return self._song
+
+    def send_midi(self, midi_bytes):
+        self.sent_midi.append(midi_bytes)
+
+    def log_message(self, msg):
+        self.log_lines.append(msg)
+        if self.echo_log:
+            print(msg)
+
+    def show_message(self, msg):
+        self.messages.append(msg)
+
+    def rebuild_midi_map(self):
+        self.midi_map_rebuilds += 1
+
+
+def make_module():
+    """
+    Builds the `Live` module the script imports.
+    """
+    module = types.ModuleType('Live')
+
+    class MapMode(object):
+        absolute = 0
+        absolute_14_bit = 1
+        relative_signed_bit = 2
+        relative_signed_bit2 = 3
+        relative_binary_offset = 4
+        relative_two_compliment = 5
+        relative_smooth_signed_bit = 6
+        relative_smooth_signed_bit2 = 7
+        relative_smooth_binary_offset = 8
+        relative_smooth_two_compliment = 9
+
+    module.MidiMap = types.ModuleType('Live.MidiMap')
+    module.MidiMap.MapMode = MapMode
+    for name in ('Song', 'Track', 'Device', 'DeviceParameter', 'ClipSlot', 'Clip', 'Scene'):
+        submodule = types.ModuleType('Live.' + name)
+        setattr(submodule, name, globals()[name])
+        setattr(module, name, submodule)
+    return module
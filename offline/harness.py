@@ -0,0 +1,84 @@
+"""
+Loads the XoneK2 script on top of the fake Live/_Framework modules and
+builds songs to run it against.
+
+    from harness import load_script, build_song, create_surface
+    xone = load_script()
+    song = build_song(num_tracks=64)
+    surface, c_instance = create_surface(song)
+    surface.receive_midi((0xBE, 0x22, 100))
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+import importlib
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_ROOT = os.path.dirname(HERE)
+SCRIPT_PACKAGE = os.path.basename(SCRIPT_ROOT)
+
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import fake_framework
+import fake_live
+
+FILTER_DEVICE_NAME = 'Macro Filter+EQ'
+STATIC_TRACK_NAMES = ('Maschine', 'Instruments', 'Loopers', 'Utilities')
+
+
+def load_script():
+    """
+    Installs the fakes and imports the script package. Returns its xone
+    module.
+    """
+    fake_framework.install()
+    parent = os.path.dirname(SCRIPT_ROOT)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    importlib.import_module(SCRIPT_PACKAGE)
+    return importlib.import_module(SCRIPT_PACKAGE + '.xone')
+
+
+def script_module(name):
+    return importlib.import_module('%s.%s' % (SCRIPT_PACKAGE, name))
+
+
+def filter_device():
+    return fake_live.Device(FILTER_DEVICE_NAME, [
+        fake_live.DeviceParameter('Lowpass', 1.0),
+        fake_live.DeviceParameter('Highpass', 0.0),
+        fake_live.DeviceParameter('Resonance', 0.2),
+        fake_live.DeviceParameter('Low', 0.5),
+        fake_live.DeviceParameter('Mid', 0.5),
+        fake_live.DeviceParameter('High', 0.5),
+        fake_live.DeviceParameter('Drive', 0.0),
+        fake_live.DeviceParameter('Dry/Wet', 1.0),
+    ])
+
+
+def build_song(num_tracks=32, num_scenes=1, num_sends=2, static_tracks=STATIC_TRACK_NAMES, devices_per_track=3):
+    """
+    A song with the static tracks first and `num_tracks` dynamic tracks.
+    Every track ends its chain with a filter device after a few others.
+    """
+    song = fake_live.Song(num_scenes=num_scenes, num_sends=num_sends)
+    names = list(static_tracks) + ['Track %d' % (i + 1) for i in range(num_tracks)]
+    for name in names:
+        devices = [fake_live.Device('Utility %d' % i, [fake_live.DeviceParameter('Gain', 0.5)])
+                   for i in range(devices_per_track - 1)]
+        devices.append(filter_device())
+        song.add_track(fake_live.Track(name, num_scenes, devices, num_sends))
+    song.add_track(fake_live.Track('MIDI Sender', num_scenes, num_sends=num_sends))
+    return song
+
+
+def create_surface(song, echo_log=False):
+    """
+    Instantiates the script the way Live does. Returns (surface, c_instance).
+    """
+    load_script()
+    package = sys.modules[SCRIPT_PACKAGE]
+    c_instance = fake_live.CInstance(song, echo_log=echo_log)
+    surface = package.create_instance(c_instance)
+    return surface, c_instance
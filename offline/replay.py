@@ -0,0 +1,77 @@
+"""
+Replays a K2 trace (recorded with XoneK2.start_trace or TRACE_DIRECTORY)
+into an offline XoneK2 and reports the same measurements as bench.py.
+
+    python offline/replay.py xonek2-20261018-201500.k2trace
+    python offline/replay.py trace.k2trace --tracks 150 --realtime --speed 2
+    python offline/replay.py trace.k2trace --profile replay.pstats
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+import argparse
+import time
+
+import harness
+from bench import format_header, format_row, percentile
+from fake_live import api_calls, reset_api_calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace')
+    parser.add_argument('--tracks', type=int, default=32, help='dynamic tracks in the song')
+    parser.add_argument('--realtime', action='store_true', help='keep the recorded timing')
+    parser.add_argument('--speed', type=float, default=1.0, help='realtime playback speed factor')
+    parser.add_argument('--profile', metavar='PSTATS', help='write a cProfile of the replay to this file')
+    args = parser.parse_args(argv)
+
+    harness.load_script()
+    midi_trace = harness.script_module('midi_trace')
+    surface, c_instance = harness.create_surface(harness.build_song(num_tracks=args.tracks))
+
+    latencies = []
+
+    def receive_midi(message):
+        start = time.perf_counter()
+        surface.receive_midi(message)
+        latencies.append(time.perf_counter() - start)
+
+    ticks = []
+
+    def tick():
+        start = time.perf_counter()
+        surface.update_display()
+        ticks.append(time.perf_counter() - start)
+
+    reset_api_calls()
+    rebuilds = c_instance.midi_map_rebuilds
+    sent = len(c_instance.sent_midi)
+    records = midi_trace.read_trace(args.trace)
+    run = lambda: midi_trace.replay(records, receive_midi, tick, realtime=args.realtime, speed=args.speed)
+    if args.profile:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.runcall(run)
+        profile.dump_stats(args.profile)
+    else:
+        run()
+
+    latencies.sort()
+    print(format_header())
+    print(format_row({
+        'scenario': 'replay',
+        'messages': len(latencies),
+        'mean_us': 1e6 * sum(latencies) / len(latencies) if latencies else 0.0,
+        'p50_us': 1e6 * percentile(latencies, 0.5),
+        'p99_us': 1e6 * percentile(latencies, 0.99),
+        'max_us': 1e6 * (latencies[-1] if latencies else 0.0),
+        'tick_us': 1e6 * sum(ticks) / len(ticks) if ticks else 0.0,
+        'api_calls': sum(api_calls.values()),
+        'api_writes': sum(n for key, n in api_calls.items() if key.startswith('set ')),
+        'rebuilds': c_instance.midi_map_rebuilds - rebuilds,
+        'midi_out': len(c_instance.sent_midi) - sent,
+    }))
+    surface.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from collections import OrderedDict
+from ableton.v2.base import liveobj_valid
+from .util import live_key
+
+
+class ParameterBatch(object):
+    """
+    Collects parameter writes and applies them together. A later write to the
+    same parameter replaces an earlier one, and parameters that already hold
+    the target value are skipped when the batch is applied.
+    """
+
+    def __init__(self):
+        self._writes = OrderedDict()
+
+    def __len__(self):
+        return len(self._writes)
+
+    def add(self, parameter, value):
+        if liveobj_valid(parameter):
+            self._writes[live_key(parameter)] = (parameter, value)
+
+    def clear(self):
+        self._writes.clear()
+
+    def apply(self):
+        """
+        Writes every pending value and returns how many writes were made.
+        """
+        writes = 0
+        pending = list(self._writes.values())
+        self._writes.clear()
+        for parameter, value in pending:
+            if liveobj_valid(parameter) and parameter.value != value:
+                parameter.value = value
+                writes += 1
+        return writes
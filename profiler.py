@@ -0,0 +1,99 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIRECTORY = os.path.join(os.path.expanduser('~'), 'XoneK2-profiles')
+SAMPLE_INTERVAL = 0.002 # Seconds between stack samples in sampling mode
+
+
+class ProfileSession(object):
+    """
+    Start/stop profiling of the running script. Each session is written to a
+    timestamped file in `directory`:
+
+    - deterministic mode (default) uses cProfile on the calling thread, which
+      is Live's main thread, and writes a .pstats file;
+    - sampling mode polls the main thread's stack from a background thread
+      every `interval` seconds and writes collapsed stacks (.folded, one
+      "frame;frame;frame count" line per stack) for flame graphs. It costs
+      the main thread almost nothing.
+    """
+
+    def __init__(self, directory=PROFILE_DIRECTORY, sampling=False, interval=SAMPLE_INTERVAL):
+        self.directory = directory
+        self.sampling = sampling
+        self.interval = interval
+        self._profile = None
+        self._sampler = None
+        self._samples = None
+        self._stop_sampling = None
+        self._started = None
+
+    @property
+    def active(self):
+        return self._started is not None
+
+    def toggle(self):
+        """
+        Starts a session, or stops the running one and returns its file.
+        """
+        if self.active:
+            return self.stop()
+        self.start()
+
+    def start(self):
+        if self.active:
+            return
+        self._started = time.time()
+        if self.sampling:
+            self._samples = Counter()
+            self._stop_sampling = threading.Event()
+            self._sampler = threading.Thread(target=self._sample, args=(threading.current_thread().ident,),
+                                             name='XoneK2-sampler')
+            self._sampler.daemon = True
+            self._sampler.start()
+        else:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        """
+        Ends the session, writes it out and returns the file path.
+        """
+        if not self.active:
+            return None
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self._started))
+        self._started = None
+        if self.sampling:
+            self._stop_sampling.set()
+            self._sampler.join(1.0)
+            self._sampler = None
+            path = os.path.join(self.directory, 'xonek2-%s.folded' % stamp)
+            with open(path, 'w') as f:
+                for stack, count in self._samples.most_common():
+                    f.write('%s %d\n' % (stack, count))
+            self._samples = None
+        else:
+            self._profile.disable()
+            path = os.path.join(self.directory, 'xonek2-%s.pstats' % stamp)
+            self._profile.dump_stats(path)
+            self._profile = None
+        return path
+
+    def _sample(self, thread_id):
+        while not self._stop_sampling.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s:%s' % (os.path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            self._samples[';'.join(reversed(stack))] += 1
@@ -1,37 +1,69 @@
 from __future__ import absolute_import, print_function, unicode_literals
 from builtins import map, range
 from _Framework.SceneComponent import SceneComponent as SceneComponentBase
-import logging
-
-logger = logging.getLogger("XoneK2")
+from _Framework.SubjectSlot import subject_slot
+from .clip_slot import ClipSlotComponent
+from .util import live_key
+from .instrumentation import instrumented
 
 class SceneComponent(SceneComponentBase):
+    clip_slot_component_type = ClipSlotComponent
+
+    def __init__(self, *a, **k):
+        self._track_indices = None
+        self._visible_real_indices = None
+        super(SceneComponent, self).__init__(*a, **k)
+        self._on_visible_tracks_changed.subject = self.song()
+
+    def on_track_list_changed(self):
+        self._invalidate_track_indices()
+        super(SceneComponent, self).on_track_list_changed()
+        # The session updates its scenes before they get this notification,
+        # i.e. with the stale indices, so update again with fresh ones.
+        self.update()
+
+    @subject_slot("visible_tracks")
+    def _on_visible_tracks_changed(self):
+        self._invalidate_track_indices()
+        self.update()
+
+    def _invalidate_track_indices(self):
+        self._track_indices = None
+        self._visible_real_indices = None
+
+    def _refresh_track_indices(self):
+        # track -> index in song().tracks, and the song().tracks index of every
+        # visible track, in order.
+        tracks = self.song().tracks
+        self._track_indices = dict((live_key(track), index) for index, track in enumerate(tracks))
+        self._visible_real_indices = [index for index, track in enumerate(tracks) if track.is_visible]
 
+    def _real_offset(self, visible_offset):
+        if visible_offset <= 0:
+            return 0
+        if visible_offset <= len(self._visible_real_indices):
+            return self._visible_real_indices[visible_offset - 1] + 1
+        return len(self._track_indices)
 
+    @instrumented("SceneComponent.update")
     def update(self):
         super(SceneComponentBase, self).update()
         if self._allow_updates:
             if self._scene != None and self.is_enabled():
-                clip_index = self._track_offset # Usually 0
-                tracks = self.song().tracks
+                if self._track_indices is None:
+                    self._refresh_track_indices()
+                track_indices = self._track_indices
                 tracks_to_use = self._tracks_to_use_callback()
                 scene_slots = self._scene.clip_slots
-                if self._track_offset > 0:
-                    real_offset = 0
-                    visible_tracks = 0
-                    while visible_tracks < self._track_offset and len(tracks) > real_offset:
-                        if tracks[real_offset].is_visible:
-                            visible_tracks += 1
-                        real_offset += 1
-                    clip_index = real_offset
+                clip_index = self._real_offset(self._track_offset) # Usually 0
                 for track in tracks_to_use:
                     if clip_index >= len(self._clip_slots):
                         break
                     if not track.is_visible:
                         continue
-                    track_index = list(tracks).index(track)
+                    track_index = track_indices.get(live_key(track))
                     slot = self._clip_slots[clip_index]
-                    if len(scene_slots) > clip_index:
+                    if track_index is not None and len(scene_slots) > track_index:
                         slot.set_clip_slot(scene_slots[track_index])
                     else:
                         slot.set_clip_slot(None)
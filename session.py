@@ -1,15 +1,23 @@
 from __future__ import absolute_import, print_function, unicode_literals
 from builtins import map, range
 from _Framework.SessionComponent import SessionComponent as SessionComponentBase
-import logging
 from .scene import SceneComponent as CustomSceneComponent
 
-logger = logging.getLogger("XoneK2")
-
 class SessionComponent(SessionComponentBase):
   clip_launch_buttons = []
   scene_component_type = CustomSceneComponent
 
+  def tracks_to_use(self):
+      # Follow the mixer's static-first ordering and bank, so the session box
+      # lines up with the strips.
+      if self._mixer is not None:
+          return self._mixer.tracks_to_use()
+      return super(SessionComponent, self).tracks_to_use()
+
+  def on_bank_changed(self):
+      for scene in self._scenes:
+          scene.update()
+
   def set_clip_launch_buttons(self, buttons):
       if buttons:
           for button, (x, y) in buttons.iterbuttons():
@@ -0,0 +1,102 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from array import array
+import time
+from ableton.v2.base import liveobj_valid
+from .parameter_batch import ParameterBatch
+
+SNAPSHOT_SLOTS = 4
+
+
+class MixerSnapshot(object):
+    """
+    Parameter values captured at one moment. The parameters are kept by
+    reference next to an array('d') of their values, so a snapshot of a
+    full mixer is a tuple and a few kilobytes of doubles.
+    """
+    __slots__ = ('parameters', 'values')
+
+    def __init__(self, parameters):
+        self.parameters = tuple(p for p in parameters if liveobj_valid(p))
+        self.values = array('d', (p.value for p in self.parameters))
+
+    def __len__(self):
+        return len(self.parameters)
+
+
+class SnapshotPlayer(object):
+    """
+    Holds the snapshot slots and plays them back. Recalls and morph steps are
+    collected in a ParameterBatch and written by `tick`, which the surface
+    calls once per display update, so a recall is a single batched write and
+    a morph writes one interpolated step per tick until it reaches the target.
+    """
+
+    def __init__(self, num_slots=SNAPSHOT_SLOTS, clock=time.time):
+        self._slots = [None] * num_slots
+        self._clock = clock
+        self._batch = ParameterBatch()
+        self._morph = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def has_snapshot(self, slot):
+        return self._slots[slot] is not None
+
+    @property
+    def morphing(self):
+        return self._morph is not None
+
+    def capture(self, slot, parameters):
+        snapshot = self._slots[slot] = MixerSnapshot(parameters)
+        return snapshot
+
+    def recall(self, slot, duration=0.0):
+        """
+        Moves every parameter in the slot back to its captured value, either
+        on the next tick or interpolated over `duration` seconds. Returns
+        False if the slot is empty.
+        """
+        snapshot = self._slots[slot]
+        if snapshot is None:
+            return False
+        self._morph = None
+        self._batch.clear()
+        if duration > 0:
+            start = array('d', (p.value if liveobj_valid(p) else 0.0 for p in snapshot.parameters))
+            self._morph = (snapshot, start, self._clock(), duration)
+        else:
+            for parameter, value in zip(snapshot.parameters, snapshot.values):
+                self._batch.add(parameter, value)
+        return True
+
+    def cancel(self):
+        self._morph = None
+        self._batch.clear()
+
+    def tick(self):
+        """
+        Writes the pending recall or the next morph step. Returns the number
+        of parameter writes.
+        """
+        if self._morph is not None:
+            snapshot, start, started, duration = self._morph
+            position = min(1.0, (self._clock() - started) / duration)
+            for parameter, begin, end in zip(snapshot.parameters, start, snapshot.values):
+                if not liveobj_valid(parameter):
+                    continue
+                if parameter.is_quantized:
+                    # Stepped parameters switch once, at the end of the morph
+                    if position < 1.0:
+                        continue
+                    value = end
+                elif position >= 1.0:
+                    value = end
+                else:
+                    value = begin + (end - begin) * position
+                self._batch.add(parameter, value)
+            if position >= 1.0:
+                self._morph = None
+        if not len(self._batch):
+            return 0
+        return self._batch.apply()
@@ -0,0 +1,93 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import re
+from collections import namedtuple
+
+EXACT = 'exact'
+SUBSTRING = 'substring'
+REGEX = 'regex'
+
+StaticTrackRule = namedtuple('StaticTrackRule', ['kind', 'pattern'])
+
+
+def exact(name):
+    return StaticTrackRule(EXACT, name)
+
+def substring(text):
+    return StaticTrackRule(SUBSTRING, text)
+
+def regex(pattern):
+    return StaticTrackRule(REGEX, pattern)
+
+def parse_rule(rule):
+    """
+    Accepts a StaticTrackRule or the legacy string form, where '/text/' means
+    "name contains text" and anything else is an exact name.
+    """
+    if isinstance(rule, StaticTrackRule):
+        return rule
+    if len(rule) > 2 and rule.startswith('/') and rule.endswith('/'):
+        return substring(rule[1:-1])
+    return exact(rule)
+
+
+class StaticTrackMatcher(object):
+    """
+    Rules compiled once, in priority order. `rank` returns the index of the
+    first rule a track name matches, or None for dynamic tracks.
+    """
+    MAX_CACHED_NAMES = 1024
+
+    def __init__(self, rules):
+        self._rules = tuple(parse_rule(rule) for rule in rules)
+        self._exact = {}
+        self._patterns = []
+        for rank, rule in enumerate(self._rules):
+            if rule.kind == EXACT:
+                self._exact.setdefault(rule.pattern, rank)
+            elif rule.kind == SUBSTRING:
+                self._patterns.append((rank, re.compile(re.escape(rule.pattern))))
+            elif rule.kind == REGEX:
+                self._patterns.append((rank, re.compile(rule.pattern)))
+            else:
+                raise ValueError("Invalid static track rule: %s" % (rule,))
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._rules)
+
+    @property
+    def rules(self):
+        return self._rules
+
+    def rank(self, name):
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        rank = self._exact.get(name)
+        for pattern_rank, pattern in self._patterns:
+            if rank is not None and pattern_rank > rank:
+                break
+            if pattern.search(name):
+                rank = pattern_rank
+                break
+        if len(self._cache) >= self.MAX_CACHED_NAMES:
+            self._cache.clear()
+        self._cache[name] = rank
+        return rank
+
+    def partition(self, tracks):
+        """
+        Splits tracks into (static, dynamic) in a single pass. Static tracks
+        come out in rule order, ties keep their song order.
+        """
+        buckets = [[] for _ in self._rules]
+        dynamic = []
+        for track in tracks:
+            rank = self.rank(track.name)
+            if rank is None:
+                dynamic.append(track)
+            else:
+                buckets[rank].append(track)
+        static = [track for bucket in buckets for track in bucket]
+        return static, dynamic
@@ -5,20 +5,29 @@ from _Generic.Devices import get_parameter_by_name
 from _Framework.ControlSurfaceComponent import ControlSurfaceComponent
 import _Framework.EncoderElement as EncoderElement
 from _Framework.Control import ButtonControl
-from _Framework.SubjectSlot import subject_slot_group
+from _Framework.SubjectSlot import subject_slot, subject_slot_group
 from ableton.v3.live import liveobj_valid
+from .device_cache import DeviceLookupCache
+from .parameter_batch import ParameterBatch
+from .util import live_key
 
-import logging
-logger = logging.getLogger("HK-DEBUG")
+from .instrumentation import instrumented
 
 class TrackFilterComponent(ControlSurfaceComponent):
 
-    def __init__(self):
+    def __init__(self, device_cache=None, reset_scheduler=None, resolve_scheduler=None):
         ControlSurfaceComponent.__init__(self)
         self._track = None
         self._device = None
+        self._parameter = None
         self._freq_control = None
         self._reset_button = None
+        self._reset_led_on = None
+        self._reset_held = False
+        self._reset_scheduler = reset_scheduler
+        self._resolve_scheduler = resolve_scheduler
+        self._off_default = set()
+        self._device_cache = device_cache if device_cache is not None else DeviceLookupCache()
 
     def disconnect(self):
         if self._freq_control != None:
@@ -28,21 +37,39 @@ class TrackFilterComponent(ControlSurfaceComponent):
             self._track.remove_devices_listener(self._on_devices_changed)
             self._track = None
         self._device = None
+        self._parameter = None
 
+    @property
+    def reset_held(self):
+        return self._reset_held
+
+    @instrumented("TrackFilterComponent.reset_button_handler")
     def reset_button_handler(self, value):
+        self._reset_held = value == 127
         if value == 127:
-            if self._track != None and liveobj_valid(self._track):
-                self.song().view.selected_track = self._track
-
-            for send in self._track.mixer_device.sends:
-                send.value = 0
-
-            if self._device != None:
-                for param in self._device.parameters[1:]:
-                    if param.state in [0, 1]:
-                        param.value = param.default_value
-
-            self._reset_button.turn_off()
+            if self._track == None or not liveobj_valid(self._track):
+                return
+            self.song().view.selected_track = self._track
+
+            if self._reset_scheduler != None:
+                self._reset_scheduler(self)
+            else:
+                batch = ParameterBatch()
+                self.collect_reset(batch)
+                batch.apply()
+
+    def collect_reset(self, batch):
+        """
+        Adds this strip's reset writes (sends to zero, filter device back to
+        defaults) to a ParameterBatch.
+        """
+        if self._track == None or not liveobj_valid(self._track):
+            return
+        for send in self._track.mixer_device.sends:
+            batch.add(send, 0)
+
+        for param in self._resettable_parameters():
+            batch.add(param, param.default_value)
 
     def on_enabled_changed(self):
         self.update()
@@ -56,23 +83,67 @@ class TrackFilterComponent(ControlSurfaceComponent):
         self._track = track
         if self._track != None:
             self._track.add_devices_listener(self._on_devices_changed)
-        self._on_devices_changed()
+        if self._resolve_scheduler != None:
+            # Device lookup and parameter listeners are set up on the next
+            # tick, so startup and bank moves don't pay for them up front.
+            self._clear_device()
+            self._resolve_scheduler(self)
+        else:
+            self.resolve_device()
 
     @subject_slot_group("value")
     def __on_parameter_value_changed(self, parameter):
+        # Track the set of parameters off their default so the LED reflects
+        # the aggregate and is only sent when that flips.
         if parameter.value != parameter.default_value:
+            self._off_default.add(live_key(parameter))
+        else:
+            self._off_default.discard(live_key(parameter))
+        self._update_reset_led()
+
+    @subject_slot_group("state")
+    def __on_parameter_state_changed(self, _parameter):
+        # Enabling or disabling a parameter changes the resettable set
+        self._refresh_resettable_parameters()
+        self._update_reset_led()
+
+    def _resettable_parameters(self):
+        # The first parameter is "Device On", which a reset leaves alone, as
+        # are disabled parameters (state 2). The reset LED tracks the same set.
+        if self._device == None:
+            return []
+        return [param for param in list(self._device.parameters)[1:] if param.state in [0, 1]]
+
+    def _rebuild_off_default(self):
+        self._off_default = set(live_key(param) for param in self._resettable_parameters()
+                                if param.value != param.default_value)
+
+    def _update_reset_led(self, force=False):
+        if self._reset_button == None:
+            return
+        led_on = len(self._off_default) > 0
+        if led_on == self._reset_led_on and not force:
+            return
+        self._reset_led_on = led_on
+        if led_on:
             self._reset_button.turn_on()
+        else:
+            self._reset_button.turn_off()
 
     def set_filter_controls(self, freq, reset_button):
         if self._device != None:
             if self._freq_control != None:
                 self._freq_control.release_parameter()
         self._freq_control = freq
+        if self._reset_button != None and self._reset_button.value_has_listener(self.reset_button_handler):
+            self._reset_button.remove_value_listener(self.reset_button_handler)
         self._reset_button = reset_button
         self._reset_button.add_value_listener(self.reset_button_handler)
+        self._update_reset_led(force=True)
 
         self.update()
 
+    @instrumented("TrackFilterComponent.update")
     def update(self):
         super(TrackFilterComponent, self).update()
         if self.is_enabled():
@@ -80,26 +151,48 @@ class TrackFilterComponent(ControlSurfaceComponent):
                 if self._freq_control != None:
                     self._freq_control.release_parameter()
 
-                parameter = None
-                for parm in self._device.parameters:
-                    if parm.name == "Lowpass":
-                        parameter = parm
-                        break
-                if parameter is None:
+                if self._parameter is None:
                     return
 
                 if self._freq_control != None:
-                    self._freq_control.connect_to(parameter)
-
+                    self._freq_control.connect_to(self._parameter)
 
+    @instrumented("TrackFilterComponent._on_devices_changed")
     def _on_devices_changed(self):
+        self._device_cache.invalidate(self._track)
+        self.resolve_device()
+
+    @subject_slot("name")
+    def _on_device_name_changed(self):
+        self._device_cache.invalidate(self._track)
+        self.resolve_device()
+
+    @subject_slot("parameters")
+    def _on_device_parameters_changed(self):
+        self._device_cache.invalidate(self._track)
+        self.resolve_device()
+
+    def _clear_device(self):
+        if self._device != None and self._freq_control != None:
+            self._freq_control.release_parameter()
         self._device = None
-        if self._track != None:
-            for index in range(len(self._track.devices)):
-                device = self._track.devices[-1 * (index + 1)]
-                if device.name == "Macro Filter+EQ":
-                    self._device = device
-                    self._TrackFilterComponent__on_parameter_value_changed.replace_subjects(self._device.parameters)
-                    break
+        self._parameter = None
+        self._on_device_name_changed.subject = None
+        self._on_device_parameters_changed.subject = None
+        self._TrackFilterComponent__on_parameter_value_changed.replace_subjects([])
+        self._TrackFilterComponent__on_parameter_state_changed.replace_subjects([])
+        self._off_default = set()
+
+    def resolve_device(self):
+        self._device, self._parameter = self._device_cache.lookup(self._track)
+        self._on_device_name_changed.subject = self._device
+        self._on_device_parameters_changed.subject = self._device
+        self._TrackFilterComponent__on_parameter_state_changed.replace_subjects(
+            list(self._device.parameters)[1:] if self._device != None else [])
+        self._refresh_resettable_parameters()
+        self._update_reset_led()
         self.update()
 
+    def _refresh_resettable_parameters(self):
+        self._TrackFilterComponent__on_parameter_value_changed.replace_subjects(self._resettable_parameters())
+        self._rebuild_off_default()
@@ -0,0 +1,50 @@
+from __future__ import absolute_import, print_function, unicode_literals
+import time
+
+
+class BindingTransaction(object):
+    """
+    Stages element bindings (setter, element) and applies them all inside a
+    single suppressed-rebuild window, so Live rebuilds its MIDI map once per
+    commit no matter how many bindings change.
+
+    Usable as a context manager; the staged bindings are committed on a clean
+    exit and dropped if the block raises.
+    """
+
+    def __init__(self, surface):
+        self._surface = surface
+        self._staged = []
+        self.duration = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self._staged = []
+        return False
+
+    def __len__(self):
+        return len(self._staged)
+
+    def stage(self, setter, element):
+        self._staged.append((setter, element))
+
+    def commit(self):
+        """
+        Applies all staged bindings and returns how long that took, in seconds.
+        """
+        start = time.time()
+        staged, self._staged = self._staged, []
+        with self._surface.component_guard():
+            self._surface._set_suppress_rebuild_requests(True)
+            try:
+                for setter, element in staged:
+                    setter(element)
+            finally:
+                self._surface._set_suppress_rebuild_requests(False)
+        self.duration = time.time() - start
+        return self.duration
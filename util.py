@@ -0,0 +1,10 @@
+from __future__ import absolute_import, print_function, unicode_literals
+
+
+def live_key(obj):
+    """
+    Stable identity for a Live object, usable as a dict key. Live can hand out
+    different Python wrappers for the same object, so wrappers are keyed by
+    the underlying pointer rather than by id().
+    """
+    return getattr(obj, '_live_ptr', None) or id(obj)
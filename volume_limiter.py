@@ -0,0 +1,61 @@
+from __future__ import absolute_import, print_function, unicode_literals
+from collections import OrderedDict
+from ableton.v2.base import liveobj_valid
+
+MAX_ALLOWED_VOLUME = 0.85 # 0db
+
+
+class VolumeLimiter(object):
+    """
+    Keeps track volumes at or below a ceiling. Strips report a volume that
+    went over their ceiling with `report`; the reports are collected in a
+    dirty set and `apply` pulls them all back in one pass, at most once per
+    tick. `scheduler` is called when the first report of a tick comes in.
+
+    `ceilings` maps track names to their own ceiling; other tracks use
+    `default_ceiling`, and a ceiling of None leaves a track alone.
+    """
+
+    def __init__(self, ceilings=None, default_ceiling=MAX_ALLOWED_VOLUME, enabled=True, scheduler=None):
+        self._ceilings = dict(ceilings or {})
+        self._default_ceiling = default_ceiling
+        self._enabled = enabled
+        self._scheduler = scheduler
+        self._dirty = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._enabled = bool(enabled)
+        if not self._enabled:
+            self._dirty.clear()
+
+    def ceiling_for(self, track):
+        """
+        Returns the ceiling that applies to `track`, or None if it is not limited.
+        """
+        if not self._enabled or not liveobj_valid(track):
+            return None
+        return self._ceilings.get(track.name, self._default_ceiling)
+
+    def set_ceiling(self, track_name, ceiling):
+        self._ceilings[track_name] = ceiling
+
+    def report(self, strip):
+        was_idle = not self._dirty
+        self._dirty[id(strip)] = strip
+        if was_idle and self._scheduler is not None:
+            self._scheduler()
+
+    def apply(self):
+        """
+        Limits every reported strip and returns how many volumes were written.
+        """
+        pending = list(self._dirty.values())
+        self._dirty.clear()
+        if not self._enabled:
+            return 0
+        return sum(1 for strip in pending if strip.reset_volume())
@@ -4,134 +4,48 @@ import time
 
 import Live
 import MidiRemoteScript
-from _Framework.ButtonElement import ButtonElement
 from _Framework.ButtonMatrixElement import ButtonMatrixElement
 from _Framework.ControlSurface import ControlSurface
 from _Framework.ClipCreator import ClipCreator
-from _Framework.EncoderElement import EncoderElement
 from _Framework.InputControlElement import *
 from _Framework.SessionRecordingComponent import SessionRecordingComponent
-from _Framework.SliderElement import SliderElement
 from _Framework.TransportComponent import TransportComponent
+from .elements import ElementRegistry
+from .instrumentation import INSTRUMENTATION_ENABLED, instrumentation, instrumented, report_file_name
+from .led_output import LedOutput, LED_MESSAGES_PER_TICK
+from .logger import logger
+from .mapping_profile import MappingProfile, MappingProfileError, available_profiles, load_mapping_profile
+from .profiler import ProfileSession, PROFILE_DIRECTORY
+from .midi_trace import TraceRecorder, trace_file_name
+from .mapping import AMBER_LAYER, GREEN_LAYER, RED_LAYER, NUM_STRIPS, layer_address, midi_map, midi_map_all_layers, strip_map
 from .mixer import MixerComponent
 from .session import SessionComponent
+from .snapshot import SnapshotPlayer
+from .transaction import BindingTransaction
 
-g_logger = None
-DEBUG = True
-
+NUM_TRACKS = NUM_STRIPS # Scales with mapping.NUM_UNITS
+NUM_SCENES = 1
 
-def log(msg):
-    global g_logger
-    if DEBUG:
-        if g_logger is not None:
-            g_logger(msg)
+# Profiling: hold PUSH_ENCODER_LL on the right K2 and press PUSH_ENCODER_LR to
+# start/stop a session. Sampling mode writes flame graph stacks instead of pstats.
+# Holding PUSH_ENCODER_LL and turning ENCODER_LR writes the handler statistics
+# (XONEK2_INSTRUMENTATION=1) to PROFILE_DIRECTORY; they are also written there
+# on disconnect.
+PROFILE_SAMPLING = False
 
+# Set to a directory to record every incoming message to a trace file there
+TRACE_DIRECTORY = None
 
-# Channels are counted from 0. This is what people would normally call
-# channel 15.
-R_CHANNEL = 14 # Right-side controller
-L_CHANNEL = 13 # Left-side controller
+FILTER_ENCODER_SENSITIVITY = 5.0
+FILTER_ENCODER_ACCELERATION = 0.0 # > 0 speeds up fast spins, e.g. 0.5
 
-NUM_TRACKS = 16
-NUM_SCENES = 1
-
-# Layer 1
-MIDI_MAPPING = {
-    "LAYER1": { # Red layer
-        "ENCODERS"        : [0, 1, 2, 3],
-        "PUSH_ENCODERS"   : [52, 53, 54, 55],
-        "KNOBS1"          : [4, 5, 6, 7],
-        "KNOBS2"          : [8, 9, 10, 11],
-        "KNOBS3"          : [12, 13, 14, 15],
-        "BUTTONS1"        : [48, 49, 50, 51],
-        "BUTTONS2"        : [44, 45, 46, 47],
-        "BUTTONS3"        : [40, 41, 42, 43],
-        "GRID1"           : [36, 37, 38, 39],
-        "GRID2"           : [32, 33, 34, 35],
-        "GRID3"           : [28, 29, 30, 31],
-        "GRID4"           : [24, 25, 26, 27],
-        "FADERS"          : [16, 17, 18, 19],
-        "ENCODER_LL"      : [20],
-        "ENCODER_LR"      : [21],
-        "PUSH_ENCODER_LL" : [13],
-        "PUSH_ENCODER_LR" : [14],
-        "BUTTON_LL"       : [12],  # DO NOT USE - RESERVED FOR LATCHING LAYERS
-        "BUTTON_LR"       : [15],
-    },
-    "LAYER2": { # Amber layer
-        "ENCODERS"        : [0x16, 0x17, 0x18, 0x19],
-        "PUSH_ENCODERS"   : [0x58, 0x59, 0x5A, 0x5B],
-        "KNOBS1"          : [0x1A, 0x1B, 0x1C, 0x1D],
-        "KNOBS2"          : [0x1E, 0x1F, 0x20, 0x21],
-        "KNOBS3"          : [0x22, 0x23, 0x24, 0x25],
-        "BUTTONS1"        : [0x54, 0x55, 0x56, 0x57],
-        "BUTTONS2"        : [0x50, 0x51, 0x52, 0x53],
-        "BUTTONS3"        : [0x4C, 0x4D, 0x4E, 0x4F],
-        "GRID1"           : [0x48, 0x49, 0x4A, 0x4B],
-        "GRID2"           : [0x44, 0x45, 0x46, 0x47],
-        "GRID3"           : [0x40, 0x41, 0x42, 0x43],
-        "GRID4"           : [0x3C, 0x3D, 0x3E, 0x3F],
-        "FADERS"          : [0x26, 0x27, 0x28, 0x29],
-        "ENCODER_LL"      : [0x2A],
-        "ENCODER_LR"      : [0x2B],
-        "PUSH_ENCODER_LL" : [0x11],
-        "PUSH_ENCODER_LR" : [0x12],
-        "BUTTON_LL"       : [0x10],  # DO NOT USE - RESERVED FOR LATCHING LAYERS
-        "BUTTON_LR"       : [0x13],
-    },
-    "LAYER3": { # Green layer
-        "ENCODERS"        : [0x2C, 0x2D, 0x2E, 0x2F],
-        "PUSH_ENCODERS"   : [0x7C, 0x7D, 0x7E, 0x7F],
-        "KNOBS1"          : [0x30, 0x31, 0x32, 0x33],
-        "KNOBS2"          : [0x34, 0x35, 0x36, 0x37],
-        "KNOBS3"          : [0x38, 0x39, 0x3A, 0x3B],
-        "BUTTONS1"        : [0x78, 0x79, 0x7A, 0x7B],
-        "BUTTONS2"        : [0x74, 0x75, 0x76, 0x77],
-        "BUTTONS3"        : [0x70, 0x71, 0x72, 0x73],
-        "GRID1"           : [0x6C, 0x6D, 0x6E, 0x6F],
-        "GRID2"           : [0x68, 0x69, 0x6A, 0x6B],
-        "GRID3"           : [0x64, 0x65, 0x66, 0x67],
-        "GRID4"           : [0x60, 0x61, 0x62, 0x63],
-        "FADERS"          : [0x3C, 0x3D, 0x3E, 0x3F],
-        "ENCODER_LL"      : [0x44],
-        "ENCODER_LR"      : [0x45],
-        "PUSH_ENCODER_LL" : [0x15],
-        "PUSH_ENCODER_LR" : [0x16],
-        "BUTTON_LL"       : [0x14],  # DO NOT USE - RESERVED FOR LATCHING LAYERS
-        "BUTTON_LR"       : [0x17],
-    }
-}
-
-RED_LAYER   = "LAYER1"
-AMBER_LAYER = "LAYER2"
-GREEN_LAYER = "LAYER3"
-
-def midi_map(controller, layer, control, cc_index=None):
-    if controller not in ["L", "R"]:
-        raise ValueError("Invalid controller: %s" % controller)
-    if layer not in ["LAYER1", "LAYER2", "LAYER3"]:
-        raise ValueError("Invalid layer: %s" % layer)
-    if control not in MIDI_MAPPING[layer]:
-        raise ValueError("Invalid control: %s" % control)
-    if cc_index is not None and cc_index >= len(MIDI_MAPPING[layer][control]):
-        raise ValueError("Invalid cc_index: %s" % cc_index)
-
-    mapping = MIDI_MAPPING[layer][control]
-    if cc_index is not None:
-        mapping = [mapping[cc_index]]
-
-    if controller == "L":
-        return list(map(lambda x: (mapping[x], L_CHANNEL), range(len(mapping))))
-    else:
-        return list(map(lambda x: (mapping[x], R_CHANNEL), range(len(mapping))))
-
-def midi_map_all_layers(controller, control, cc_index=None):
-    mappings = []
-    for layer in [AMBER_LAYER, GREEN_LAYER, RED_LAYER]:
-        for cc, channel in midi_map(controller, layer, control, cc_index):
-            mappings.append((cc, channel))
-    return mappings
+SNAPSHOT_MORPH_BEATS = 8
 
+# Strip controls come from profiles/<name>.json; the lists below are the
+# built-in defaults for roles a profile leaves out. Hold PUSH_ENCODER_LL on
+# the left K2 and press PUSH_ENCODER_LR to switch to the next profile (or
+# reload the current one after editing it, if it is the only one).
+MAPPING_PROFILE = 'default'
 
 # Right-side controls
 
@@ -141,67 +55,73 @@ METRO_BUTTONS             = midi_map_all_layers("R", "BUTTONS3", cc_index=2)
 STOP_ALL_CLIPS_BUTTONS    = midi_map_all_layers("R", "BUTTONS3", cc_index=3)
 PLAY_BUTTONS              = midi_map_all_layers("R", "BUTTON_LR")
 LAYER_SWITCH_BUTTONS      = midi_map_all_layers("R", "BUTTON_LL") # We will spy on this button to switch transport buttons
+BANK_ENCODERS             = midi_map_all_layers("R", "ENCODER_LL") # Pages the dynamic tracks
+PROFILE_HOLD_BUTTONS      = midi_map_all_layers("R", "PUSH_ENCODER_LL")
+PROFILE_TOGGLE_BUTTONS    = midi_map_all_layers("R", "PUSH_ENCODER_LR")
+INSTRUMENTATION_ENCODERS  = midi_map_all_layers("R", "ENCODER_LR")
 
 # Left-side controls
 GLOBAL_STOP_BUTTON        = midi_map("L", AMBER_LAYER, "BUTTON_LR")
+# Mixer snapshots, one slot per column: recall jumps to the slot, morph glides
+# there over SNAPSHOT_MORPH_BEATS, and holding capture while pressing recall
+# stores the current mix in the slot.
+SNAPSHOT_CAPTURE_BUTTON   = midi_map("L", RED_LAYER, "BUTTON_LR")
+SNAPSHOT_RECALL_BUTTONS   = midi_map("L", RED_LAYER, "BUTTONS2")
+SNAPSHOT_MORPH_BUTTONS    = midi_map("L", RED_LAYER, "BUTTONS3")
+MAPPING_HOLD_BUTTONS      = midi_map_all_layers("L", "PUSH_ENCODER_LL")
+MAPPING_NEXT_BUTTONS      = midi_map_all_layers("L", "PUSH_ENCODER_LR")
 
 # Channel strip controls
-FILTER_ENCODERS           = midi_map("R", AMBER_LAYER, "ENCODERS")      + midi_map("L", AMBER_LAYER, "ENCODERS")      + midi_map("R", GREEN_LAYER, "ENCODERS")      + midi_map("R", RED_LAYER, "ENCODERS")
-FILTER_RESET_BUTTONS      = midi_map("R", AMBER_LAYER, "PUSH_ENCODERS") + midi_map("L", AMBER_LAYER, "PUSH_ENCODERS") + midi_map("R", GREEN_LAYER, "PUSH_ENCODERS") + midi_map("R", RED_LAYER, "PUSH_ENCODERS")
-SENDS_A_KNOBS             = midi_map("R", AMBER_LAYER, "KNOBS1")        + midi_map("L", AMBER_LAYER, "KNOBS1")        + midi_map("R", GREEN_LAYER, "KNOBS1")        + midi_map("R", RED_LAYER, "KNOBS1")
-SENDS_B_KNOBS             = midi_map("R", AMBER_LAYER, "KNOBS2")        + midi_map("L", AMBER_LAYER, "KNOBS2")        + midi_map("R", GREEN_LAYER, "KNOBS2")        + midi_map("R", RED_LAYER, "KNOBS2")
-VOLUME_FADERS             = midi_map("R", AMBER_LAYER, "KNOBS3")        + midi_map("L", AMBER_LAYER, "KNOBS3")        + midi_map("R", GREEN_LAYER, "KNOBS3")        + midi_map("R", RED_LAYER, "KNOBS3")
-MUTE_BUTTONS              = midi_map("R", AMBER_LAYER, "BUTTONS1")      + midi_map("L", AMBER_LAYER, "BUTTONS1")      + midi_map("R", GREEN_LAYER, "BUTTONS1")      + midi_map("R", RED_LAYER, "BUTTONS1")
-LAUNCH_BUTTONS            = midi_map("R", AMBER_LAYER, "GRID1")         + midi_map("L", AMBER_LAYER, "GRID1")         + midi_map("R", GREEN_LAYER, "GRID1")         + midi_map("R", RED_LAYER, "GRID1")
-STOP_BUTTONS              = midi_map("R", AMBER_LAYER, "GRID2")         + midi_map("L", AMBER_LAYER, "GRID2")         + midi_map("R", GREEN_LAYER, "GRID2")         + midi_map("R", RED_LAYER, "GRID2")
-SOLO_BUTTONS              = midi_map("R", AMBER_LAYER, "GRID3")         + midi_map("L", AMBER_LAYER, "GRID3")         + midi_map("R", GREEN_LAYER, "GRID3")         + midi_map("R", RED_LAYER, "GRID3")
-ARM_BUTTONS               = midi_map("R", AMBER_LAYER, "GRID4")         + midi_map("L", AMBER_LAYER, "GRID4")         + midi_map("R", GREEN_LAYER, "GRID4")         + midi_map("R", RED_LAYER, "GRID4")
-
-
-
-def button(cc, name=None):
-    channel = cc[1]
-    cc = cc[0]
-    rv = ButtonElement(True, MIDI_NOTE_TYPE, channel, cc)
-    if name is not None:
-        rv.name = name
-    return rv
-
-def fader(cc):
-    channel = cc[1]
-    cc = cc[0]
-    return SliderElement(MIDI_CC_TYPE, channel, cc)
-
-def knob(cc):
-    channel = cc[1]
-    cc = cc[0]
-    return EncoderElement(MIDI_CC_TYPE, channel, cc, Live.MidiMap.MapMode.absolute)
-
-def encoder(cc, map_mode=Live.MidiMap.MapMode.absolute, encoder_sensitivity=1.0):
-    channel = cc[1]
-    cc = cc[0]
-    return EncoderElement(MIDI_CC_TYPE, channel, cc, map_mode, encoder_sensitivity=encoder_sensitivity)
-
-
-class HighPassEncoder:
-    def __init__(self, cc):
-        self.encoder = encoder(cc)
-        self.last_scroll_time = 0
-        self.last_value = None
-        self.encoder.add_value_listener(self._on_value)
-
-    def add_value_listener(self, callback):
-        self._callback = callback
-
-    def _on_value(self, value):
-        if self._callback is None:
-            return
-        self._callback(value)
+FILTER_ENCODERS           = strip_map("ENCODERS")
+FILTER_RESET_BUTTONS      = strip_map("PUSH_ENCODERS")
+SENDS_A_KNOBS             = strip_map("KNOBS1")
+SENDS_B_KNOBS             = strip_map("KNOBS2")
+VOLUME_FADERS             = strip_map("KNOBS3")
+MUTE_BUTTONS              = strip_map("BUTTONS1")
+LAUNCH_BUTTONS            = strip_map("GRID1")
+STOP_BUTTONS              = strip_map("GRID2")
+SOLO_BUTTONS              = strip_map("GRID3")
+ARM_BUTTONS               = strip_map("GRID4")
+
+DEFAULT_STRIP_ROLES = {
+    "FILTER_ENCODERS"      : FILTER_ENCODERS,
+    "FILTER_RESET_BUTTONS" : FILTER_RESET_BUTTONS,
+    "SENDS_A_KNOBS"        : SENDS_A_KNOBS,
+    "SENDS_B_KNOBS"        : SENDS_B_KNOBS,
+    "VOLUME_FADERS"        : VOLUME_FADERS,
+    "MUTE_BUTTONS"         : MUTE_BUTTONS,
+    "LAUNCH_BUTTONS"       : LAUNCH_BUTTONS,
+    "STOP_BUTTONS"         : STOP_BUTTONS,
+    "SOLO_BUTTONS"         : SOLO_BUTTONS,
+    "ARM_BUTTONS"          : ARM_BUTTONS,
+}
+
+# Addresses a profile cannot assign to strips
+RESERVED_ADDRESSES = [(MIDI_NOTE_TYPE, cc, channel) for cc, channel in
+                      NEW_TRACK_BUTTON + RECORD_BUTTONS + METRO_BUTTONS + STOP_ALL_CLIPS_BUTTONS + PLAY_BUTTONS +
+                      LAYER_SWITCH_BUTTONS + PROFILE_HOLD_BUTTONS + PROFILE_TOGGLE_BUTTONS + GLOBAL_STOP_BUTTON +
+                      SNAPSHOT_CAPTURE_BUTTON + SNAPSHOT_RECALL_BUTTONS + SNAPSHOT_MORPH_BUTTONS +
+                      MAPPING_HOLD_BUTTONS + MAPPING_NEXT_BUTTONS] + \
+                     [(MIDI_CC_TYPE, cc, channel) for cc, channel in BANK_ENCODERS + INSTRUMENTATION_ENCODERS]
+
+
+
 class XoneK2(ControlSurface):
     def __init__(self, c_instance, *a, **k):
-        global g_logger
-        g_logger = self.log_message
+        start = time.time()
         super(XoneK2, self).__init__(c_instance=c_instance, *a, **k)
+        logger.start(self.log_message)
+        self._led_output = LedOutput(self._send_midi, messages_per_tick=LED_MESSAGES_PER_TICK)
+        self._elements = ElementRegistry(led_output=self._led_output)
+        self._trace_recorder = None
+        self._layer_bindings = {}
+        self._mapping_profile = self._load_mapping_profile(MAPPING_PROFILE) or MappingProfile('built-in', dict(DEFAULT_STRIP_ROLES))
+        self._strip_roles = self._mapping_profile.roles
+        if TRACE_DIRECTORY is not None:
+            try:
+                self.start_trace(TRACE_DIRECTORY)
+            except (IOError, OSError) as e:
+                logger.error('Not recording a MIDI trace: %s', e)
         with self.component_guard():
             self._set_suppress_rebuild_requests(True)
             self.init_session()
@@ -209,17 +129,86 @@ class XoneK2(ControlSurface):
             self.init_scene_launch()
             self.init_mixer()
             self.init_layer_switch()
+            self.init_banking()
+            self.init_snapshots()
+            self.init_mapping_profiles()
+            self.init_profiler()
 
             self.session.set_mixer(self.mixer)
             self.session.update()
             self._set_suppress_rebuild_requests(False)
-            log('HK-DEBUG XoneK2 initialized')
+        self.startup_time = time.time() - start
+        logger.info('XoneK2 initialized in %.1fms (%d elements)', self.startup_time * 1000.0, len(self._elements))
+
+    def disconnect(self):
+        self.stop_trace()
+        if self._profiler.active:
+            self._profiler.stop()
+        if INSTRUMENTATION_ENABLED:
+            self.dump_instrumentation(report_file_name(PROFILE_DIRECTORY))
+        super(XoneK2, self).disconnect()
+        logger.stop()
+
+    def receive_midi(self, midi_bytes):
+        # Only sees messages Live forwards to the script, i.e. ones that are
+        # not handled natively by a parameter mapping.
+        if self._trace_recorder is not None:
+            self._trace_recorder.record(midi_bytes)
+        super(XoneK2, self).receive_midi(midi_bytes)
+
+    def start_trace(self, directory):
+        self.stop_trace()
+        path = trace_file_name(directory)
+        self._trace_recorder = TraceRecorder(path)
+        logger.info('Recording MIDI trace to %s', path)
+        return path
+
+    def stop_trace(self):
+        recorder, self._trace_recorder = self._trace_recorder, None
+        if recorder is not None:
+            recorder.close()
+            logger.info('Recorded %d messages to %s', recorder.recorded, recorder.path)
+
+    def update_display(self):
+        super(XoneK2, self).update_display()
+        for filter_encoder in self._filter_encoders:
+            filter_encoder.flush()
+        self._snapshots.tick()
+        self._led_output.flush()
+        logger.flush()
+
+    def dump_instrumentation(self, path=None):
+        """
+        Writes the handler latency report to `path`, or shows a one-line
+        summary in Live's status bar.
+        """
+        if path is not None:
+            instrumentation.dump(path)
+            logger.info('Wrote handler statistics to %s', path)
+        else:
+            self.show_message(instrumentation.summary())
+
+    def refresh_state(self):
+        self._led_output.invalidate()
+        super(XoneK2, self).refresh_state()
 
     def init_scene_launch(self):
         scene = self.session.scene(0)
         scene.name = 'Scene 0'
-        self.session.set_stop_all_clips_button(button(STOP_ALL_CLIPS_BUTTONS[0]))
-        self.session.set_stop_track_clip_buttons([button(b) for b in STOP_BUTTONS])
+        self.session.set_stop_all_clips_button(self._bindings_for_layer(0)[3])
+        self.session.set_stop_track_clip_buttons(self._stop_buttons())
+        self.session.set_clip_launch_buttons(ButtonMatrixElement(rows=[[self._elements.button(b) for b in self._strip_roles['LAUNCH_BUTTONS']]]))
+        for index in range(NUM_TRACKS):
+            scene.clip_slot(index).set_state_leds(*self._launch_state_leds(index))
+
+    def _stop_buttons(self):
+        return [self._elements.button(b) for b in self._strip_roles['STOP_BUTTONS']]
+
+    def _launch_state_leds(self, index):
+        b = self._strip_roles['LAUNCH_BUTTONS'][index]
+        return (self._elements.button(layer_address(b, GREEN_LAYER)),
+                self._elements.button(layer_address(b, AMBER_LAYER)),
+                self._elements.button(layer_address(b, RED_LAYER)))
 
 
     def init_session(self):
@@ -230,39 +219,248 @@ class XoneK2(ControlSurface):
 
     def init_transport(self):
         self.transport = TransportComponent()
-        self.transport.set_play_button(button(PLAY_BUTTONS[0]))
-        self.transport.set_record_button(button(RECORD_BUTTONS[0]))
-        self.transport.set_metronome_button(button(METRO_BUTTONS[0]))
-        self.transport.set_stop_button(button(GLOBAL_STOP_BUTTON[0]))
+        play, record, metro, _stop_all_clips = self._bindings_for_layer(0)
+        self.transport.set_play_button(play)
+        self.transport.set_record_button(record)
+        self.transport.set_metronome_button(metro)
+        self.transport.set_stop_button(self._elements.button(GLOBAL_STOP_BUTTON[0]))
         self.transport.update()
 
     def init_mixer(self):
         self.mixer = MixerComponent(num_tracks=NUM_TRACKS)
         self.mixer.id = 'Mixer'
 
-        log('HK-DEBUG init_mixer')
-        self.mixer.set_volume_controls([fader(VOLUME_FADERS[i]) for i in range(NUM_TRACKS)])
+        logger.debug('init_mixer')
+        self._filter_encoders = []
+        # Strips stay bound whatever layer is active (a profile spreads them
+        # over layers itself), so their elements are built here; only the
+        # transport buttons depend on the layer and are built on first switch.
+        roles = self._strip_roles
+        self.mixer.set_volume_controls([self._elements.fader(roles['VOLUME_FADERS'][i]) for i in range(NUM_TRACKS)])
         for i in range(NUM_TRACKS):
-            self.mixer.channel_strip(i).set_send_controls([knob(SENDS_A_KNOBS[i]), knob(SENDS_B_KNOBS[i])])
+            self.mixer.channel_strip(i).set_send_controls(self._send_controls(i))
             filter = self.mixer.track_filter(i)
-            enc = encoder(FILTER_ENCODERS[i], Live.MidiMap.MapMode.relative_smooth_two_compliment, encoder_sensitivity=5.0)
-            enc.mapping_sensitivity = 5.0
-            reset_button = button(FILTER_RESET_BUTTONS[i])
+            enc = self._filter_encoder(i)
+            self._filter_encoders.append(enc)
+            reset_button = self._elements.button(roles['FILTER_RESET_BUTTONS'][i])
             filter.set_filter_controls(enc, reset_button)
 
-        self.mixer.set_solo_buttons([button(SOLO_BUTTONS[i]) for i in range(NUM_TRACKS)])
-        self.mixer.set_mute_buttons([button(MUTE_BUTTONS[i]) for i in range(NUM_TRACKS)])
-        self.mixer.set_arm_buttons([button(ARM_BUTTONS[i]) for i in range(NUM_TRACKS)])
-        self.mixer.set_new_track_button([button(NEW_TRACK_BUTTON[0])])
+        self.mixer.set_solo_buttons([self._elements.button(roles['SOLO_BUTTONS'][i]) for i in range(NUM_TRACKS)])
+        self.mixer.set_mute_buttons([self._elements.button(roles['MUTE_BUTTONS'][i]) for i in range(NUM_TRACKS)])
+        self.mixer.set_arm_buttons([self._elements.button(roles['ARM_BUTTONS'][i]) for i in range(NUM_TRACKS)])
+        self.mixer.set_new_track_button([self._elements.button(NEW_TRACK_BUTTON[0])])
         self.mixer.update()
 
+    def _send_controls(self, index):
+        return [self._elements.knob(self._strip_roles['SENDS_A_KNOBS'][index]),
+                self._elements.knob(self._strip_roles['SENDS_B_KNOBS'][index])]
+
+    def _filter_encoder(self, index):
+        return self._elements.coalescing_encoder(self._strip_roles['FILTER_ENCODERS'][index],
+                                                 sensitivity=FILTER_ENCODER_SENSITIVITY,
+                                                 acceleration=FILTER_ENCODER_ACCELERATION)
+
+    @instrumented("XoneK2._on_layer_switch")
     def _on_layer_switch(self, layer, _value):
         layer = (layer + 1) % len(LAYER_SWITCH_BUTTONS) # Cycle through layers
-        self.transport.set_play_button(button(PLAY_BUTTONS[layer]))
-        self.transport.set_record_button(button(RECORD_BUTTONS[layer]))
-        self.transport.set_metronome_button(button(METRO_BUTTONS[layer]))
-        self.session.set_stop_all_clips_button(button(STOP_ALL_CLIPS_BUTTONS[layer]))
+        if layer == self._active_layer:
+            return
+        self._active_layer = layer
+        play, record, metro, stop_all_clips = self._bindings_for_layer(layer)
+        with self.binding_transaction() as transaction:
+            transaction.stage(self.transport.set_play_button, play)
+            transaction.stage(self.transport.set_record_button, record)
+            transaction.stage(self.transport.set_metronome_button, metro)
+            transaction.stage(self.session.set_stop_all_clips_button, stop_all_clips)
+        logger.debug('Layer switch to %d took %.2fms', layer, transaction.duration * 1000.0)
+
+    def binding_transaction(self):
+        return BindingTransaction(self)
+
+    def _bindings_for_layer(self, layer):
+        # Built the first time a layer is used, then reused; switching only
+        # swaps which set of elements the transport and session listen to.
+        bindings = self._layer_bindings.get(layer)
+        if bindings is None:
+            bindings = self._layer_bindings[layer] = (
+                self._elements.button(PLAY_BUTTONS[layer]),
+                self._elements.button(RECORD_BUTTONS[layer]),
+                self._elements.button(METRO_BUTTONS[layer]),
+                self._elements.button(STOP_ALL_CLIPS_BUTTONS[layer]))
+        return bindings
 
     def init_layer_switch(self):
+        self._active_layer = 0
         for layer, b in enumerate(LAYER_SWITCH_BUTTONS):
-            button(b).add_value_listener(partial(self._on_layer_switch, layer))
+            self._elements.button(b).add_value_listener(partial(self._on_layer_switch, layer))
+
+    def init_banking(self):
+        for b in BANK_ENCODERS:
+            self._elements.encoder(b, Live.MidiMap.MapMode.relative_two_compliment).add_value_listener(self._on_bank_encoder)
+
+    def _on_bank_encoder(self, value):
+        pages = 1 if value < 64 else -1
+        with self.component_guard():
+            if not self.mixer.scroll_bank(pages):
+                return
+            self.session.on_bank_changed()
+        size = self.mixer.bank_size
+        num_dynamic = self.mixer.num_dynamic_tracks()
+        first = self.mixer.bank_offset
+        self.show_message('XoneK2 bank %d/%d: tracks %d-%d' % (
+            first // size + 1, max(1, (num_dynamic + size - 1) // size), first + 1, min(first + size, num_dynamic)))
+
+    def _on_hold_button(self, _value):
+        # Only here so Live forwards hold buttons and is_pressed() tracks them
+        pass
+
+    def _any_pressed(self, buttons):
+        return any(b.is_pressed() for b in buttons)
+
+    def init_snapshots(self):
+        self._snapshots = SnapshotPlayer(len(SNAPSHOT_RECALL_BUTTONS))
+        self._snapshot_capture_button = self._elements.button(SNAPSHOT_CAPTURE_BUTTON[0])
+        self._snapshot_capture_button.add_value_listener(self._on_hold_button)
+        self._snapshot_recall_buttons = [self._elements.button(b) for b in SNAPSHOT_RECALL_BUTTONS]
+        for slot, b in enumerate(self._snapshot_recall_buttons):
+            b.add_value_listener(partial(self._on_snapshot_recall, slot))
+            b.turn_off()
+        for slot, b in enumerate(SNAPSHOT_MORPH_BUTTONS):
+            self._elements.button(b).add_value_listener(partial(self._on_snapshot_morph, slot))
+
+    def _on_snapshot_recall(self, slot, value):
+        if not value:
+            return
+        if self._snapshot_capture_button.is_pressed():
+            snapshot = self._snapshots.capture(slot, self.mixer.snapshot_parameters())
+            self._snapshot_recall_buttons[slot].turn_on()
+            self.show_message('XoneK2: snapshot %d captured (%d parameters)' % (slot + 1, len(snapshot)))
+        elif self._snapshots.recall(slot):
+            self.show_message('XoneK2: snapshot %d recalled' % (slot + 1))
+
+    def _on_snapshot_morph(self, slot, value):
+        if not value:
+            return
+        duration = SNAPSHOT_MORPH_BEATS * 60.0 / self.song().tempo
+        if self._snapshots.recall(slot, duration):
+            self.show_message('XoneK2: morphing to snapshot %d over %d beats' % (slot + 1, SNAPSHOT_MORPH_BEATS))
+
+    def init_mapping_profiles(self):
+        self._mapping_hold_buttons = [self._elements.button(b) for b in MAPPING_HOLD_BUTTONS]
+        for b in self._mapping_hold_buttons:
+            b.add_value_listener(self._on_hold_button)
+        for b in MAPPING_NEXT_BUTTONS:
+            self._elements.button(b).add_value_listener(self._on_mapping_next)
+
+    def _on_mapping_next(self, value):
+        if not value or not self._any_pressed(self._mapping_hold_buttons):
+            return
+        names = available_profiles()
+        if not names:
+            return
+        current = self._mapping_profile.name
+        name = names[(names.index(current) + 1) % len(names)] if current in names else names[0]
+        changed = self.switch_mapping_profile(name)
+        if changed is not None:
+            self.show_message('XoneK2: mapping profile %s (%d controls changed)' % (name, changed))
+
+    def _load_mapping_profile(self, name):
+        try:
+            profile = load_mapping_profile(name, DEFAULT_STRIP_ROLES, RESERVED_ADDRESSES)
+        except MappingProfileError as e:
+            logger.error('Mapping profile %s not loaded: %s', name, e)
+            self.show_message('XoneK2: mapping profile %s not loaded: %s' % (name, e))
+            return None
+        logger.info('Mapping profile %s loaded%s', name, ' from cache' if profile.cached else '')
+        return profile
+
+    def switch_mapping_profile(self, name):
+        """
+        Loads (or reloads) a mapping profile and rebinds only the strip
+        controls whose address changed. Returns how many changed, or None if
+        the profile could not be loaded.
+        """
+        profile = self._load_mapping_profile(name)
+        if profile is None:
+            return None
+        changed = self._mapping_profile.changed_bindings(profile)
+        self._mapping_profile = profile
+        self._strip_roles = profile.roles
+        rebinds = set()
+        for role, index in changed:
+            if role in ('FILTER_ENCODERS', 'FILTER_RESET_BUTTONS'):
+                rebinds.add(('filter', index))
+            elif role in ('SENDS_A_KNOBS', 'SENDS_B_KNOBS'):
+                rebinds.add(('sends', index))
+            elif role == 'STOP_BUTTONS':
+                rebinds.add(('stop', None))
+            else:
+                rebinds.add((role, index))
+        with self.binding_transaction() as transaction:
+            for kind, index in sorted(rebinds, key=lambda r: (r[0], r[1] or 0)):
+                self._stage_rebind(transaction, kind, index)
+        logger.info('Mapping profile %s: %d controls rebound', name, len(changed))
+        return len(changed)
+
+    def _stage_rebind(self, transaction, kind, index):
+        roles = self._strip_roles
+        if kind == 'filter':
+            enc = self._filter_encoders[index] = self._filter_encoder(index)
+            transaction.stage(partial(self.mixer.track_filter(index).set_filter_controls, enc),
+                              self._elements.button(roles['FILTER_RESET_BUTTONS'][index]))
+        elif kind == 'sends':
+            transaction.stage(self.mixer.channel_strip(index).set_send_controls, self._send_controls(index))
+        elif kind == 'stop':
+            transaction.stage(self.session.set_stop_track_clip_buttons, self._stop_buttons())
+        elif kind == 'VOLUME_FADERS':
+            transaction.stage(self.mixer.channel_strip(index).set_volume_control, self._elements.fader(roles[kind][index]))
+        elif kind == 'MUTE_BUTTONS':
+            transaction.stage(self.mixer.channel_strip(index).set_mute_button, self._elements.button(roles[kind][index]))
+        elif kind == 'SOLO_BUTTONS':
+            transaction.stage(self.mixer.channel_strip(index).set_solo_button, self._elements.button(roles[kind][index]))
+        elif kind == 'ARM_BUTTONS':
+            transaction.stage(self.mixer.channel_strip(index).set_arm_button, self._elements.button(roles[kind][index]))
+        elif kind == 'LAUNCH_BUTTONS':
+            slot = self.session.scene(0).clip_slot(index)
+            transaction.stage(slot.set_launch_button, self._elements.button(roles[kind][index]))
+            transaction.stage(lambda leds: slot.set_state_leds(*leds), self._launch_state_leds(index))
+
+    def init_profiler(self):
+        self._profiler = ProfileSession(PROFILE_DIRECTORY, sampling=PROFILE_SAMPLING)
+        self._instrumentation_dumped = False
+        self._profile_hold_buttons = [self._elements.button(b) for b in PROFILE_HOLD_BUTTONS]
+        for b in self._profile_hold_buttons:
+            b.add_value_listener(self._on_profile_hold)
+        for b in PROFILE_TOGGLE_BUTTONS:
+            self._elements.button(b).add_value_listener(self._on_profile_toggle)
+        for b in INSTRUMENTATION_ENCODERS:
+            self._elements.encoder(b, Live.MidiMap.MapMode.relative_two_compliment).add_value_listener(self._on_instrumentation_dump)
+
+    def _on_profile_hold(self, value):
+        # Every press of the hold button allows one instrumentation dump
+        if value:
+            self._instrumentation_dumped = False
+
+    def _on_profile_toggle(self, value):
+        if not value or not self._any_pressed(self._profile_hold_buttons):
+            return
+        path = self._profiler.toggle()
+        if path is None:
+            self.show_message('XoneK2: profiling started')
+            logger.info('Profiling started')
+        else:
+            self.show_message('XoneK2: profile written to %s' % path)
+            logger.info('Profile written to %s', path)
+
+    def _on_instrumentation_dump(self, _value):
+        # The encoder sends a value per detent; only the first one after the
+        # hold press dumps, the rest of the turn is ignored
+        if self._instrumentation_dumped or not self._any_pressed(self._profile_hold_buttons):
+            return
+        self._instrumentation_dumped = True
+        if not INSTRUMENTATION_ENABLED:
+            self.show_message('XoneK2: set XONEK2_INSTRUMENTATION=1 to collect handler statistics')
+            return
+        path = report_file_name(PROFILE_DIRECTORY)
+        self.dump_instrumentation(path)
+        self.show_message('XoneK2: handler statistics written to %s | %s' % (path, instrumentation.summary()))